@@ -0,0 +1,111 @@
+"""Admission control and client pacing for the frame endpoints.
+
+Without it a saturated server keeps accepting frames: requests pile up in
+Flask threads, latency grows without bound and detections run on stale
+frames.  ``AdmissionController`` bounds the work in three ways:
+
+* at most ``per_student`` frames of one student are processed at a time;
+  a newer frame waits for the slot, and a frame that is still waiting when
+  an even newer one arrives is dropped as superseded;
+* at most ``max_in_flight`` frames are running or waiting server-wide;
+  beyond that a frame is refused immediately ("busy");
+* every response carries ``next_interval_ms``, a send interval that grows
+  from ``base_interval_ms`` towards ``max_interval_ms`` as load rises past
+  ``target_load``, so clients back off before the server has to refuse.
+
+Dropped or refused frames never reach the rule engine, so the debounce
+counters only ever see whole frames, in order.
+"""
+import threading, time
+
+ADMITTED, BUSY, SUPERSEDED = 'admitted', 'busy', 'superseded'
+
+
+class _Slot:
+    __slots__ = ('running', 'seq', 'waiting')
+
+    def __init__(self):
+        self.running = 0
+        self.seq     = 0      # last waiting frame's ticket; older waiters give up
+        self.waiting = 0
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight, per_student=1, base_interval_ms=1000, max_interval_ms=5000,
+                 target_load=0.5, wait_timeout=2.0):
+        self.max_in_flight    = max(1, max_in_flight)
+        self.per_student      = max(1, per_student)
+        self.base_interval_ms = base_interval_ms
+        self.max_interval_ms  = max(base_interval_ms, max_interval_ms)
+        self.target_load      = min(max(target_load, 0.0), 0.99)
+        self.wait_timeout     = wait_timeout
+        self.admitted = self.busy = self.superseded = 0
+        self._cond  = threading.Condition()
+        self._slots = {}
+        self._total = 0  # running + waiting, all students
+
+    def enter(self, student_id):
+        """Claim a processing slot; returns ADMITTED, BUSY or SUPERSEDED."""
+        with self._cond:
+            if self._total >= self.max_in_flight:
+                self.busy += 1
+                return BUSY
+            slot = self._slots.setdefault(student_id, _Slot())
+            self._total += 1
+            if slot.running >= self.per_student:
+                slot.seq += 1
+                ticket, deadline = slot.seq, time.monotonic() + self.wait_timeout
+                slot.waiting += 1
+                self._cond.notify_all()  # wake the frame this one supersedes
+                while slot.running >= self.per_student and slot.seq == ticket:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        break
+                slot.waiting -= 1
+                if slot.running >= self.per_student or slot.seq != ticket:
+                    self._total -= 1
+                    self._forget(student_id, slot)
+                    self._cond.notify_all()
+                    if slot.seq != ticket:
+                        self.superseded += 1
+                        return SUPERSEDED
+                    self.busy += 1  # the student's previous frame is still running
+                    return BUSY
+            slot.running += 1
+            self.admitted += 1
+            return ADMITTED
+
+    def leave(self, student_id):
+        with self._cond:
+            slot = self._slots[student_id]
+            slot.running -= 1
+            self._total  -= 1
+            self._forget(student_id, slot)
+            self._cond.notify_all()
+
+    def _forget(self, student_id, slot):
+        if not slot.running and not slot.waiting:
+            self._slots.pop(student_id, None)
+
+    def load(self):
+        return self._total / self.max_in_flight
+
+    def next_interval_ms(self, base_ms=None):
+        """Recommended client send interval for the current load, starting
+        from ``base_ms`` (a per-exam interval) or ``base_interval_ms``."""
+        base   = self.base_interval_ms if base_ms is None else base_ms
+        excess = (self.load() - self.target_load) / (1 - self.target_load)
+        excess = min(max(excess, 0.0), 1.0)
+        return int(base + excess * (max(self.max_interval_ms, base) - base))
+
+    def stats(self):
+        with self._cond:
+            return {
+                'in_flight': self._total,
+                'max_in_flight': self.max_in_flight,
+                'load': round(self.load(), 3),
+                'admitted': self.admitted,
+                'busy': self.busy,
+                'superseded': self.superseded,
+                'next_interval_ms': self.next_interval_ms(),
+            }
@@ -0,0 +1,90 @@
+"""Cross-student micro-batching for YOLOv5 inference.
+
+Flask request threads hand their frame to an ``InferenceBatcher`` and block
+until the result comes back.  A single scheduler thread collects frames from
+concurrent requests (up to ``max_batch`` frames, or whatever arrived within
+``max_wait_ms`` of the first one) and runs them through the model in one
+forward pass.
+"""
+import os, queue, threading, time
+from concurrent.futures import Future
+
+
+class FrameDetections:
+    """One frame's slice of a batched result.
+
+    Keeps the ``results.xyxy[0]`` / ``results.names`` contract of a
+    single-image YOLOv5 call so the rule code does not change.
+    """
+    __slots__ = ('xyxy', 'names')
+
+    def __init__(self, xyxy, names):
+        self.xyxy  = [xyxy]
+        self.names = names
+
+
+class InferenceBatcher:
+    def __init__(self, model, max_batch=8, max_wait_ms=10.0, size=640):
+        self.model      = model
+        self.max_batch  = max(1, int(max_batch))
+        self.max_wait   = max(0.0, float(max_wait_ms)) / 1000.0
+        self.size       = size
+        self.batches    = 0
+        self.frames     = 0
+        self._start()
+        # prefork workers (workers.py) need their own scheduler thread
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self._queue  = queue.Queue()
+        self._lock   = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='yolo-batcher', daemon=True)
+        self._thread.start()
+
+    def infer(self, rgb, timeout=None):
+        """Queue one RGB frame and wait for its detections."""
+        fut = Future()
+        self._queue.put((rgb, fut))
+        return fut.result(timeout)
+
+    def stats(self):
+        with self._lock:
+            mean = self.frames / self.batches if self.batches else 0.0
+            return {
+                'batches': self.batches,
+                'frames': self.frames,
+                'mean_batch_size': round(mean, 2),
+                'queued': self._queue.qsize(),
+            }
+
+    # ── scheduler loop ──────────────────────
+    def _collect(self):
+        batch    = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self.model([img for img, _ in batch], size=self.size)
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+
+            for i, (_, fut) in enumerate(batch):
+                fut.set_result(FrameDetections(results.xyxy[i], results.names))
+
+            with self._lock:
+                self.batches += 1
+                self.frames  += len(batch)
@@ -0,0 +1,80 @@
+"""Per-frame vs micro-batched YOLOv5 throughput.
+
+Simulates N students calling the detector concurrently, once the way
+camera_server.py used to (every thread calls ``model(rgb, size=640)``) and
+once through ``InferenceBatcher``.  Reports frames/s and p50/p99 latency.
+
+    cd camera-detection
+    python -m benchmarks.batching --students 32 --frames 20 --batch 8 --wait-ms 10
+    python -m benchmarks.batching --images path/to/jpegs   # real webcam frames
+"""
+import argparse, glob, os, threading, time
+import numpy as np, cv2, torch
+
+from batcher import InferenceBatcher
+
+
+def load_frames(images, count):
+    if images:
+        paths  = sorted(glob.glob(os.path.join(images, '*.jpg')))[:count]
+        frames = [cv2.cvtColor(cv2.imread(p), cv2.COLOR_BGR2RGB) for p in paths]
+        if frames:
+            return frames
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else 0.0
+
+
+def run(label, infer, frames, students, per_student):
+    latencies, lock = [], threading.Lock()
+
+    def client(idx):
+        local = []
+        for i in range(per_student):
+            rgb = frames[(idx + i) % len(frames)]
+            t0  = time.perf_counter()
+            infer(rgb)
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(students)]
+    start   = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    total = students * per_student
+    print(f"{label:<10} {total / elapsed:8.1f} fps   "
+          f"p50 {percentile(latencies, 50):7.1f} ms   p99 {percentile(latencies, 99):7.1f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--students', type=int, default=32)
+    ap.add_argument('--frames', type=int, default=20, help='frames per student')
+    ap.add_argument('--batch', type=int, default=8)
+    ap.add_argument('--wait-ms', type=float, default=10)
+    ap.add_argument('--images', help='directory of JPEG frames (synthetic noise if omitted)')
+    args = ap.parse_args()
+
+    model = torch.hub.load('ultralytics/yolov5', 'yolov5s', pretrained=True)
+    model.conf, model.iou = 0.5, 0.45
+    frames = load_frames(args.images, 64)
+    _ = model(frames[0], size=640)
+
+    print(f"{args.students} students x {args.frames} frames, torch threads={torch.get_num_threads()}")
+    run('per-frame', lambda rgb: model(rgb, size=640), frames, args.students, args.frames)
+
+    batcher = InferenceBatcher(model, max_batch=args.batch, max_wait_ms=args.wait_ms, size=640)
+    run('batched', batcher.infer, frames, args.students, args.frames)
+    print('batcher:', batcher.stats())
+
+
+if __name__ == '__main__':
+    main()
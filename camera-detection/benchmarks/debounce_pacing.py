@@ -0,0 +1,119 @@
+"""Regression check: time-based debounce under server-paced frame rates.
+
+Admission control (admission.py) stretches the client's frame interval up
+to ``MAX_FRAME_INTERVAL_MS`` as the server fills up.  This replays a
+steady no-face stream through the server's ``RuleEngine`` with
+``DEFAULT_DURATIONS`` at each ``--intervals`` value, pacing the student's
+``FrameClock`` the way ``admit_frame`` does, and checks that
+
+* the no-face rule fires, after 8 s give or take one interval,
+* it still fires when every other frame is refused as busy,
+* it never fires when a face shows up often enough to break the streak,
+* a single-frame phone/book detection never fires, whatever the interval,
+
+and that the clock keeps accepting frames after a page reload restarts
+the client's sequence numbers or the client's clock steps back two
+minutes, while late and repeated frames are stale.
+
+    cd camera-detection
+    python -m benchmarks.debounce_pacing --intervals 1 2 3 3.5 5
+"""
+import argparse, sys
+import numpy as np
+
+from batcher import FrameDetections
+from detector_backends import COCO_NAMES
+from face_sessions import FaceResult
+from rules import RuleEngine, FrameSignals, default_rules, DEFAULT_DURATIONS
+
+NO_DETECTIONS = FrameDetections(np.zeros((0, 6), np.float32), {})
+NAMES = dict(enumerate(COCO_NAMES))
+
+
+def replay(engine, interval, frames, refuse_every=0, face_every=0, min_gap=3.0):
+    """Seconds into the stream at which NO_FACE first fired (None if never)."""
+    counters = engine.counters(min_gap, interval)
+    clock    = counters['CLOCK']
+    for n in range(frames):
+        ts = 1000.0 + n * interval
+        if refuse_every and n % refuse_every == refuse_every - 1:
+            clock.pace(interval, analysed=False)  # busy: never reached the rules
+            continue
+        clock.accept(ts, n)
+        faces = 1 if face_every and n % face_every == face_every - 1 else 0
+        hit   = engine.evaluate(counters, FrameSignals(FaceResult(faces, None), lambda: NO_DETECTIONS), ts)
+        clock.pace(interval)
+        if hit and hit.rule.name == 'NO_FACE_COUNTER':
+            return ts - 1000.0 + interval  # the first frame stands for one interval
+    return None
+
+
+def single_detection_fires(interval, label, min_gap=3.0):
+    """One frame with ``label`` among empty ones; the rule that fired, if any."""
+    engine   = RuleEngine([r for r in default_rules(durations=DEFAULT_DURATIONS) if r.signal == 'detections'])
+    counters = engine.counters(min_gap, interval)
+    seen     = FrameDetections(np.array([[10, 10, 50, 50, 0.9, COCO_NAMES.index(label)]], np.float32), NAMES)
+    for n in range(6):
+        ts  = 1000.0 + n * interval
+        counters['CLOCK'].accept(ts, n)
+        hit = engine.evaluate(counters, FrameSignals(FaceResult(1, None),
+                                                     lambda n=n: seen if n == 3 else NO_DETECTIONS), ts)
+        counters['CLOCK'].pace(interval)
+        if hit:
+            return hit.rule.name
+    return None
+
+
+def reload_accepted(interval):
+    """Frames 0..9, a reload (seq back to 0, newer ts), then a late and a repeated frame."""
+    clock = RuleEngine([]).counters(interval=interval)['CLOCK']
+    first = [clock.accept(1000.0 + n * interval, n) for n in range(10)]
+    after = [clock.accept(1100.0 + n * interval, n) for n in range(10)]
+    late, repeat = clock.accept(1100.0, 0), clock.accept(1100.0 + 9 * interval, 9)
+    return all(first) and all(after) and not late and not repeat
+
+
+def rewind_accepted(interval):
+    """Frames 0..9, then the client clock steps back two minutes."""
+    clock = RuleEngine([]).counters(interval=interval)['CLOCK']
+    first = [clock.accept(1000.0 + n * interval, n) for n in range(10)]
+    after = [clock.accept(880.0 + n * interval, 10 + n) for n in range(10)]
+    return all(first) and all(after)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--intervals', type=float, nargs='+', default=[1, 2, 3, 3.5, 5], help='seconds')
+    ap.add_argument('--min-gap', type=float, default=3.0, help='DEBOUNCE_MAX_GAP_S')
+    args = ap.parse_args()
+
+    engine = RuleEngine([r for r in default_rules(durations=DEFAULT_DURATIONS) if r.signal == 'faces'])
+    need   = DEFAULT_DURATIONS['NO_FACE_COUNTER']
+    checks = []
+    for interval in args.intervals:
+        frames = int(4 * need / interval) + 4
+        steady = replay(engine, interval, frames, min_gap=args.min_gap)
+        busy   = replay(engine, interval, 2 * frames, refuse_every=2, min_gap=args.min_gap)
+        broken = replay(engine, interval, frames, face_every=max(2, int(need / interval)), min_gap=args.min_gap)
+        checks += [
+            (f"{interval:g} s: fires after {steady} s", steady is not None and steady <= need + interval,
+             "never fired" if steady is None else "too late"),
+            (f"{interval:g} s, every other frame busy: fires after {busy} s",
+             busy is not None and busy <= need + 2 * interval, "never fired" if busy is None else "too late"),
+            (f"{interval:g} s, face seen regularly: no verdict", broken is None, f"fired after {broken} s"),
+        ]
+        for label in ('cell phone', 'book'):
+            fired = single_detection_fires(interval, label, args.min_gap)
+            checks.append((f"{interval:g} s, one {label} frame: no verdict", fired is None, f"{fired} fired"))
+    checks.append(("reload restarts seq: frames accepted, late/repeated ones stale",
+                   reload_accepted(args.intervals[0]), "rejected after reload"))
+    checks.append(("client clock stepped back 2 min: frames accepted",
+                   rewind_accepted(args.intervals[0]), "rejected as stale"))
+    for label, ok, detail in checks:
+        print(f"  {'✅' if ok else '❌'} {label}" + ('' if ok else f" - {detail}"))
+    if not all(ok for _, ok, _ in checks):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Accuracy vs latency of the detector backends on a held-out frame set.
+
+Runs every requested backend/size/model over the same JPEG frames and
+compares it with the reference (eager torch at 640, what the server shipped
+with).  For each variant it prints single-frame p50/p95 latency, batched
+throughput, box recall/precision against the reference (same class,
+IoU >= 0.5), and - what actually matters to the proctoring rules - how often
+the per-frame phone and object verdicts agree with the reference.
+
+    cd camera-detection
+    python export_detector.py --size 320 416 640 --int8 --calib /data/frames/calib
+    python -m benchmarks.detector_accuracy /data/frames/heldout \\
+        --variant torch:640 torch:416 torch:320 \\
+        --variant onnx:640:models/yolov5s-640.onnx onnx:416:models/yolov5s-416-int8.onnx \\
+        --variant openvino:416:models/yolov5s-416-int8.onnx
+
+Keep the calibration and held-out directories disjoint.
+"""
+import argparse, glob, os, time
+import numpy as np, cv2
+
+from detector_backends import load_detector
+
+PHONE_CONF_THRESH = 0.6                                # mirror camera_server.py
+OBJECT_CLASSES    = ['laptop', 'book', 'tablet', 'remote']
+
+
+def load_frames(frame_dir, limit):
+    paths = sorted(glob.glob(os.path.join(frame_dir, '*.jp*g')))[:limit]
+    if not paths:
+        raise SystemExit(f"no JPEG frames found in {frame_dir}")
+    return [cv2.cvtColor(cv2.imread(p), cv2.COLOR_BGR2RGB) for p in paths]
+
+
+def as_array(dets):
+    """Detections for one frame as a float ndarray (torch tensors included)."""
+    return dets.cpu().numpy() if hasattr(dets, 'cpu') else np.asarray(dets)
+
+
+def verdicts(dets, names):
+    """The phone/object hits the rules in camera_server.py would see."""
+    phone = obj = False
+    for *_, conf, cls in dets:
+        label = names[int(cls)]
+        phone |= label == 'cell phone' and conf >= PHONE_CONF_THRESH
+        obj   |= label in OBJECT_CLASSES
+    return phone, obj
+
+
+def iou(box, boxes):
+    x1 = np.maximum(box[0], boxes[:, 0]); y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2]); y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area  = lambda b: (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / (area(box) + area(boxes) - inter + 1e-9)
+
+
+def matched(ref, pred, thresh=0.5):
+    """Greedy same-class matching; returns the number of matched boxes."""
+    used, hits = np.zeros(len(pred), bool), 0
+    for box in ref[np.argsort(-ref[:, 4])] if len(ref) else ():
+        cand = np.where((pred[:, 5] == box[5]) & ~used)[0] if len(pred) else []
+        if len(cand):
+            scores = iou(box, pred[cand])
+            best = scores.argmax()
+            if scores[best] >= thresh:
+                used[cand[best]] = True
+                hits += 1
+    return hits
+
+
+def run_variant(model, frames, batch):
+    model.warmup()
+    dets, lat = [], []
+    for rgb in frames:
+        t0 = time.perf_counter()
+        res = model(rgb)
+        lat.append(time.perf_counter() - t0)
+        dets.append(as_array(res.xyxy[0]))
+
+    t0 = time.perf_counter()
+    for i in range(0, len(frames), batch):
+        model(frames[i:i + batch])
+    fps = len(frames) / (time.perf_counter() - t0)
+    return dets, model.names, np.array(lat) * 1000, fps
+
+
+def parse_variant(spec):
+    backend, size, *path = spec.split(':', 2)
+    return backend, int(size), (path[0] if path else None)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('frames', help='directory of held-out JPEG frames')
+    ap.add_argument('--variant', nargs='+', action='extend', default=[],
+                    help='backend:size[:model_path], e.g. onnx:416:models/yolov5s-416-int8.onnx')
+    ap.add_argument('--reference', default='torch:640')
+    ap.add_argument('--limit', type=int, default=500)
+    ap.add_argument('--batch', type=int, default=8)
+    ap.add_argument('--threads', type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    frames = load_frames(args.frames, args.limit)
+    print(f"{len(frames)} held-out frames, {args.threads} threads\n")
+
+    def load(spec):
+        backend, size, path = parse_variant(spec)
+        return load_detector(backend, path, size=size, conf=0.5, iou=0.45, threads=args.threads)
+
+    ref_dets, ref_names, *_ = run_variant(load(args.reference), frames, args.batch)
+    ref_verdicts = [verdicts(d, ref_names) for d in ref_dets]
+    ref_boxes    = sum(len(d) for d in ref_dets)
+
+    print(f"{'variant':<48} {'p50 ms':>8} {'p95 ms':>8} {'batch fps':>10} "
+          f"{'recall':>7} {'prec':>7} {'phone':>7} {'object':>7}")
+    for spec in [args.reference] + [v for v in args.variant if v != args.reference]:
+        dets, names, lat, fps = run_variant(load(spec), frames, args.batch)
+        hits  = sum(matched(r, p) for r, p in zip(ref_dets, dets))
+        boxes = sum(len(d) for d in dets)
+        agree = np.array([verdicts(d, names) for d in dets]) == np.array(ref_verdicts)
+        print(f"{spec:<48} {np.percentile(lat, 50):8.1f} {np.percentile(lat, 95):8.1f} {fps:10.1f} "
+              f"{hits / max(ref_boxes, 1):7.1%} {hits / max(boxes, 1):7.1%} "
+              f"{agree[:, 0].mean():7.1%} {agree[:, 1].mean():7.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Per-frame cost and verdict parity of the face cascade (FACE_CASCADE=1).
+
+Feeds one recorded frame sequence (video file or directory of JPEGs, in
+order) through the current path - a tracking-mode FaceMeshSession on every
+frame - and through the cascade at each ``--landmark-every`` cadence, and
+runs the server's face rules (no-face, multi-face, head-turn, gaze, with
+their debounce) on both.  Reports face-analysis latency, how often the
+refined mesh actually ran, and how often the face count and the fired
+verdicts agree with the current path.
+
+    cd camera-detection
+    python -m benchmarks.face_cascade path/to/session.mp4 --landmark-every 1 2 4
+"""
+import argparse, collections, time
+import numpy as np
+
+from face_sessions import FaceMeshSession, cascade_stats
+from preprocess import to_rgb
+from rules import RuleEngine, FrameSignals, default_rules
+from benchmarks.facemesh_modes import read_frames
+
+
+def run(session, frames, engine):
+    """Face-analysis latency (ms), face counts and fired rule per frame."""
+    counters, times, faces, fired = engine.counters(), [], [], []
+    for rgb in frames:
+        t0  = time.perf_counter()
+        res = session.process(rgb, force=engine.face_pending(counters))
+        times.append(time.perf_counter() - t0)
+        hit = engine.evaluate(counters, FrameSignals(res, detect=None))
+        faces.append(res.num_faces)
+        fired.append(hit.rule.name if hit else None)
+    session.close()
+    return np.array(times) * 1000, faces, fired
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('source', help='video file or directory of JPEG frames')
+    ap.add_argument('--landmark-every', type=int, nargs='+', default=[1, 2, 4])
+    ap.add_argument('--max-side', type=int, default=640, help='FRAME_MAX_SIDE')
+    args = ap.parse_args()
+
+    frames = [to_rgb(bgr, args.max_side) for bgr in read_frames(args.source)]
+    if not frames:
+        raise SystemExit(f"no frames in {args.source}")
+    engine = RuleEngine([r for r in default_rules() if r.signal != 'detections'])
+
+    t_ref, faces_ref, fired_ref = run(FaceMeshSession(), frames, engine)
+    print(f"{len(frames)} frames, {frames[0].shape[1]}x{frames[0].shape[0]}\n")
+    print(f"{'path':<22} {'mean ms':>8} {'p50 ms':>7} {'p95 ms':>7} {'mesh':>6} "
+          f"{'faces':>7} {'verdicts':>9}   fired")
+
+    def row(label, t, faces, fired, mesh_rate):
+        fired_at = {i for i, f in enumerate(fired) if f}
+        ref_at   = {i for i, f in enumerate(fired_ref) if f}
+        agree    = np.mean([a == b for a, b in zip(fired, fired_ref)])
+        counts   = collections.Counter(f for f in fired if f)
+        print(f"{label:<22} {t.mean():8.2f} {np.percentile(t, 50):7.2f} {np.percentile(t, 95):7.2f} "
+              f"{mesh_rate:6.0%} {np.mean(np.array(faces) == faces_ref):7.1%} {agree:9.1%}   "
+              f"{dict(counts)} (+{len(fired_at - ref_at)} / -{len(ref_at - fired_at)})")
+
+    row('facemesh every frame', t_ref, faces_ref, fired_ref, 1.0)
+    for every in args.landmark_every:
+        before = cascade_stats.snapshot()['mesh_runs']
+        t, faces, fired = run(FaceMeshSession(cascade=True, landmark_every=every), frames, engine)
+        row(f'cascade every {every}', t, faces, fired,
+            (cascade_stats.snapshot()['mesh_runs'] - before) / len(frames))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""FaceMesh static-image mode vs tracking-mode FaceMeshSession.
+
+Feeds one recorded frame sequence (video file or directory of JPEGs, in
+order) through both modes and reports per-frame latency plus parity of the
+head-turn and gaze verdicts, both per frame and after the usual debounce.
+
+    cd camera-detection
+    python -m benchmarks.facemesh_modes path/to/session.mp4
+    python -m benchmarks.facemesh_modes path/to/jpegs --head-angle 45
+"""
+import argparse, glob, os, time
+import numpy as np, cv2
+
+from face_sessions import FaceMeshSession, create_face_mesh, head_pose, gaze_ratio
+
+
+def read_frames(source):
+    if os.path.isdir(source):
+        for path in sorted(glob.glob(os.path.join(source, '*.jpg'))):
+            yield cv2.imread(path)
+        return
+    cap = cv2.VideoCapture(source)
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        yield frame
+    cap.release()
+
+
+def flags(res, args):
+    """(faces, head_turned, gaze_averted) for one FaceMesh result."""
+    if not res.multi_face_landmarks:
+        return 0, False, False
+    lm = res.multi_face_landmarks[0].landmark
+    ratio = gaze_ratio(lm)
+    return (len(res.multi_face_landmarks),
+            abs(head_pose(lm)) > args.head_angle,
+            ratio < args.gaze_min or ratio > args.gaze_max)
+
+
+def debounce(seq, frames):
+    fired, run = [], 0
+    for hit in seq:
+        run = run + 1 if hit else 0
+        fired.append(run >= frames)
+        if run >= frames:
+            run = 0
+    return fired
+
+
+def measure(process, frames, args):
+    times, out = [], []
+    for bgr in frames:
+        rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+        t0  = time.perf_counter()
+        res = process(rgb)
+        times.append(time.perf_counter() - t0)
+        out.append(flags(res, args))
+    return np.array(times) * 1000, out
+
+
+def agreement(a, b):
+    return sum(x == y for x, y in zip(a, b)) / max(len(a), 1) * 100
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('source', help='video file or directory of JPEG frames')
+    ap.add_argument('--head-angle', type=float, default=45)
+    ap.add_argument('--gaze-min', type=float, default=0.3)
+    ap.add_argument('--gaze-max', type=float, default=0.7)
+    ap.add_argument('--debounce', type=int, default=8)
+    args = ap.parse_args()
+
+    frames = list(read_frames(args.source))
+    if not frames:
+        raise SystemExit(f"no frames in {args.source}")
+
+    static  = create_face_mesh(static_image_mode=True)
+    session = FaceMeshSession()
+    t_static, f_static = measure(static.process, frames, args)
+    t_track,  f_track  = measure(session.process, frames, args)
+
+    print(f"{len(frames)} frames")
+    for label, t in (('static', t_static), ('tracking', t_track)):
+        print(f"{label:<9} mean {t.mean():6.1f} ms   p50 {np.percentile(t, 50):6.1f} ms   "
+              f"p99 {np.percentile(t, 99):6.1f} ms")
+
+    for i, name in ((0, 'face count'), (1, 'head-turn'), (2, 'gaze')):
+        a, b = [f[i] for f in f_static], [f[i] for f in f_track]
+        line = f"{name:<10} per-frame agreement {agreement(a, b):5.1f}%"
+        if i:
+            da, db = debounce(a, args.debounce), debounce(b, args.debounce)
+            line += f"   verdicts static={sum(da)} tracking={sum(db)} agreement {agreement(da, db):5.1f}%"
+        print(line)
+    print(f"graph restarts: {session.restarts}")
+
+
+if __name__ == '__main__':
+    main()
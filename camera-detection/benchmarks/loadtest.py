@@ -0,0 +1,274 @@
+"""Load-test / replay harness for camera_server.py.
+
+Replays webcam JPEG sequences from N simulated students against
+``/process_frame`` (and ``/process_frame_practice`` for a share of them)
+at a fixed per-student frame rate, with a local stand-in for the Node
+backend's ``/api/cheats`` that stores every uploaded clip.  Reports
+throughput, p50/p95/p99 latency, error rate, server RSS growth and - given
+a golden run - how many per-frame verdicts changed.
+
+Frame sources (``--frames``): a directory of JPEGs (every student replays
+it from a different offset), a directory of per-student subdirectories,
+or a video file; synthetic noise frames if omitted.
+
+    cd camera-detection
+    # launch the server against the stub backend and record a golden run
+    JWT_SECRET=... python -m benchmarks.loadtest --launch --frames /data/sessions \\
+        --students 32 --fps 2 --seconds 60 --save-golden golden.json
+    # after a change: same replay, compare
+    JWT_SECRET=... python -m benchmarks.loadtest --launch --frames /data/sessions \\
+        --students 32 --fps 2 --seconds 60 --golden golden.json
+
+The replay is deterministic per student (same frames, same order, same
+pacing, and every frame stamped with its scheduled capture time and index
+via ``X-Frame-Ts`` / ``X-Frame-Seq``), so verdict drift against the golden
+run means detection changed.
+"""
+import argparse, email, glob, json, os, subprocess, sys, tempfile, threading, time
+from email.policy import default as email_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np, cv2, jwt, requests
+
+from benchmarks.worker_scaling import HERE, synthetic_jpeg, wait_ready
+
+
+# ── stub Node backend ───────────────────────
+class StubBackend:
+    """``POST /api/cheats`` sink that keeps every uploaded clip on disk."""
+
+    def __init__(self, clip_dir, port=0):
+        self.clip_dir = clip_dir
+        self.clips    = []
+        self.lock     = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if self.path != '/api/cheats':
+                    self.send_error(404)
+                    return
+                msg = email.message_from_bytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body,
+                    policy=email_policy)
+                fields, clip = {}, None
+                for part in msg.iter_parts():
+                    name = part.get_param('name', header='content-disposition')
+                    if name == 'clip':
+                        clip = part.get_payload(decode=True)
+                    else:
+                        fields[name] = part.get_content()
+                stub.record(fields, clip, self.headers.get('Authorization'))
+                self.send_response(201)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(b'{"ok":true}')
+
+            def log_message(self, *_):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.url    = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def record(self, fields, clip, auth):
+        with self.lock:
+            n = len(self.clips)
+            path = os.path.join(self.clip_dir, f'{n:05d}.mp4')
+            self.clips.append(dict(fields, bytes=len(clip or b''), path=path, auth=bool(auth)))
+        with open(path, 'wb') as f:
+            f.write(clip or b'')
+
+
+# ── frames ──────────────────────────────────
+def jpegs_from_video(path, quality=80):
+    cap, out = cv2.VideoCapture(path), []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        out.append(cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes())
+    cap.release()
+    return out
+
+
+def jpegs_from_dir(path):
+    out = []
+    for p in sorted(glob.glob(os.path.join(path, '*.jp*g'))):
+        with open(p, 'rb') as f:
+            out.append(f.read())
+    return out
+
+
+def load_sequences(source, students):
+    """One JPEG sequence per student."""
+    if not source:
+        base = [synthetic_jpeg(i) for i in range(32)]
+        return [base[i % len(base):] + base[:i % len(base)] for i in range(students)]
+    if os.path.isfile(source):
+        base = jpegs_from_video(source)
+    else:
+        subdirs = sorted(d for d in glob.glob(os.path.join(source, '*')) if os.path.isdir(d))
+        if subdirs:
+            seqs = [jpegs_from_dir(d) for d in subdirs]
+            return [seqs[i % len(seqs)] for i in range(students)]
+        base = jpegs_from_dir(source)
+    if not base:
+        sys.exit(f'no frames found in {source}')
+    step = max(1, len(base) // max(1, students))
+    return [base[i * step % len(base):] + base[:i * step % len(base)] for i in range(students)]
+
+
+# ── server process ──────────────────────────
+def rss_bytes(pid):
+    """Resident memory of ``pid`` and all its descendants (prefork workers)."""
+    total, stack = 0, [pid]
+    while stack:
+        p = stack.pop()
+        try:
+            with open(f'/proc/{p}/status') as f:
+                total += next(int(l.split()[1]) * 1024 for l in f if l.startswith('VmRSS:'))
+            for task in os.listdir(f'/proc/{p}/task'):
+                with open(f'/proc/{p}/task/{task}/children') as f:
+                    stack.extend(int(c) for c in f.read().split())
+        except (OSError, StopIteration):
+            pass
+    return total
+
+
+def launch_server(args, stub_url):
+    env = dict(os.environ, NODE_BACKEND=stub_url, WORKERS=str(args.workers),
+               EVIDENCE_SPOOL_DIR=tempfile.mkdtemp(prefix='loadtest-spool-'))
+    log = open(os.path.join(args.out, 'server.log'), 'w')
+    return subprocess.Popen([sys.executable, 'camera_server.py'], cwd=HERE, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+
+
+# ── replay ──────────────────────────────────
+def replay(url, secret, sequences, args):
+    """Drive every student for ``args.seconds``; returns per-request records."""
+    records, lock = [], threading.Lock()
+    n_frames = int(args.seconds * args.fps)
+    start_at = time.perf_counter() + 0.5
+    epoch    = time.time() - time.perf_counter()  # perf_counter → epoch seconds
+
+    def student(i, frames):
+        practice = i < round(args.practice_share * len(sequences))
+        token = jwt.encode({'userId': f'loadtest-{i}', 'role': 'student', 'exp': int(time.time()) + 86400},
+                           secret, algorithm='HS256')
+        path  = '/process_frame_practice' if practice else '/process_frame'
+        headers = {'Content-Type': 'image/jpeg', 'Authorization': f'Bearer {token}',
+                   'X-Exam-Id': 'practice' if practice else 'loadtest'}
+        http, local = requests.Session(), []
+        t0 = start_at + (i / len(sequences)) / args.fps  # spread students over one interval
+        for n in range(n_frames):
+            delay = t0 + n / args.fps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            sent = time.perf_counter()
+            # stamp the scheduled capture time, so time-based debounce sees
+            # the same clock on every replay whatever the server latency
+            stamp = {'X-Frame-Ts': f'{(epoch + t0 + n / args.fps) * 1000:.0f}', 'X-Frame-Seq': str(n)}
+            try:
+                resp = http.post(url + path, data=frames[n % len(frames)], headers={**headers, **stamp},
+                                 timeout=60)
+                body = resp.json() if resp.headers.get('Content-Type', '').startswith('application/json') else {}
+                verdict, ok = body.get('reason') or body.get('status') or resp.status_code, resp.ok
+            except requests.RequestException as e:
+                verdict, ok = f'exception: {type(e).__name__}', False
+            local.append((i, n, time.perf_counter() - sent, ok, verdict))
+        try:
+            http.post(url + '/cleanup_student', json={'token': f'Bearer {token}'}, timeout=10)
+        except requests.RequestException:
+            pass
+        with lock:
+            records.extend(local)
+
+    threads = [threading.Thread(target=student, args=(i, seq)) for i, seq in enumerate(sequences)]
+    t_start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return records, time.perf_counter() - t_start
+
+
+def compare_golden(verdicts, golden):
+    keys    = sorted(set(verdicts) & set(golden))
+    changed = [k for k in keys if verdicts[k] != golden[k]]
+    print(f"parity        {1 - len(changed) / max(len(keys), 1):.2%} of {len(keys)} frames match the golden run")
+    for k in changed[:10]:
+        print(f"  {k}: golden={golden[k]!r} now={verdicts[k]!r}")
+    return changed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--url', default='http://127.0.0.1:5001', help='server to drive (ignored with --launch)')
+    ap.add_argument('--launch', action='store_true', help='start camera_server.py against the stub backend')
+    ap.add_argument('--workers', type=int, default=1, help='WORKERS for --launch')
+    ap.add_argument('--server-pid', type=int, help='pid to sample RSS from when not launching')
+    ap.add_argument('--frames', help='JPEG dir, dir of per-student dirs, or video file')
+    ap.add_argument('--students', type=int, default=16)
+    ap.add_argument('--fps', type=float, default=1.0, help='frames per second per student')
+    ap.add_argument('--seconds', type=float, default=30)
+    ap.add_argument('--practice-share', type=float, default=0.0, help='fraction of students in practice mode')
+    ap.add_argument('--stub-port', type=int, default=0)
+    ap.add_argument('--out', default=None, help='directory for clips and the server log')
+    ap.add_argument('--save-golden', help='write per-frame verdicts to this JSON file')
+    ap.add_argument('--golden', help='compare per-frame verdicts with this JSON file')
+    args = ap.parse_args()
+
+    secret = os.getenv('JWT_SECRET')
+    if not secret:
+        sys.exit('JWT_SECRET must be set (the same one the server uses)')
+    args.out = args.out or tempfile.mkdtemp(prefix='loadtest-')
+    clip_dir = os.path.join(args.out, 'clips')
+    os.makedirs(clip_dir, exist_ok=True)
+    stub = StubBackend(clip_dir, args.stub_port)
+    sequences = load_sequences(args.frames, args.students)
+
+    server, url, pid = None, args.url, args.server_pid
+    if args.launch:
+        server, url = launch_server(args, stub.url), 'http://127.0.0.1:5001'
+        pid = server.pid
+    try:
+        wait_ready(url)
+        rss_before = rss_bytes(pid) if pid else 0
+        records, elapsed = replay(url, secret, sequences, args)
+        time.sleep(2)  # let queued clips upload
+        rss_after = rss_bytes(pid) if pid else 0
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    lat    = np.array([r[2] for r in records]) * 1000
+    shed   = sum(1 for r in records if r[4] in ('busy', 'superseded'))
+    errors = sum(1 for r in records if not r[3]) - sum(1 for r in records if r[4] == 'busy')
+    print(f"{args.students} students x {args.fps:g} fps x {args.seconds:g}s "
+          f"({args.practice_share:.0%} practice), {os.cpu_count()} CPUs")
+    print(f"throughput    {(len(records) - shed) / elapsed:8.1f} frames/s analysed "
+          f"(offered {args.students * args.fps:g}, shed frames excluded)")
+    print(f"latency       p50 {np.percentile(lat, 50):7.1f} ms   p95 {np.percentile(lat, 95):7.1f} ms   "
+          f"p99 {np.percentile(lat, 99):7.1f} ms")
+    print(f"errors        {errors} ({errors / max(len(records), 1):.2%})")
+    print(f"shed          {shed} ({shed / max(len(records), 1):.2%}) busy or superseded")
+    if pid:
+        print(f"server RSS    {rss_before / 2**20:.0f} MB → {rss_after / 2**20:.0f} MB "
+              f"({(rss_after - rss_before) / 2**20:+.0f} MB)")
+    print(f"clips         {len(stub.clips)} uploaded to the stub → {stub.clip_dir}")
+
+    verdicts = {f'{r[0]}:{r[1]}': r[4] for r in records}
+    if args.save_golden:
+        with open(args.save_golden, 'w') as f:
+            json.dump(verdicts, f, indent=0, sort_keys=True)
+        print(f"golden        saved {len(verdicts)} verdicts to {args.save_golden}")
+    if args.golden:
+        with open(args.golden) as f:
+            if compare_golden(verdicts, json.load(f)):
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Stress test: per-student ordering and counter consistency under concurrency.
+
+Many simulated students each send a long, seeded sequence of frames whose
+face count, head angle, gaze ratio and phone detections are synthetic, and
+every frame runs the server's ``RuleEngine`` against the student's shared
+counters dict - the state ``process_frame`` mutates.  Frames are submitted
+through ``StudentExecutor`` from several request threads at once, and the
+run checks that
+
+* every student's sequence of fired verdicts equals a sequential run,
+* no student ever had two frames running at once,
+* no more than ``--workers`` frames ran at once overall,
+* a deliberately non-atomic per-student frame counter lost no updates.
+
+``--no-executor`` runs each frame on its own thread instead (what Flask's
+``threaded=True`` did) to show the checks fail without it.
+
+    cd camera-detection
+    python -m benchmarks.ordering_stress --students 64 --frames 300 --workers 8
+"""
+import argparse, math, random, sys, threading, time
+from types import SimpleNamespace
+import numpy as np
+
+from batcher import FrameDetections
+from detector_backends import COCO_NAMES
+from executor import StudentExecutor
+from face_sessions import FaceResult
+from rules import RuleEngine, FrameSignals, default_rules
+
+NAMES = dict(enumerate(COCO_NAMES))
+PHONE = COCO_NAMES.index('cell phone')
+
+
+def landmarks(angle, gaze):
+    """478 FaceMesh-like points with the given head_pose() angle and gaze_ratio()."""
+    pts = [SimpleNamespace(x=0.5, y=0.5) for _ in range(478)]
+    pts[33]  = SimpleNamespace(x=0.4, y=0.5)
+    pts[263] = SimpleNamespace(x=0.4 + 0.2 * math.cos(math.radians(angle)),
+                               y=0.5 + 0.2 * math.sin(math.radians(angle)))
+    pts[133] = SimpleNamespace(x=0.5, y=0.5)
+    for i in (468, 469, 470, 471):
+        pts[i] = SimpleNamespace(x=0.4 + 0.1 * gaze, y=0.5)
+    return [SimpleNamespace(landmark=pts)]
+
+
+def make_frames(seed, n):
+    """Bursty synthetic signals, so every rule fires now and then."""
+    rng, frames, mode = random.Random(seed), [], 'ok'
+    for _ in range(n):
+        if rng.random() < 0.15:
+            mode = rng.choice(['ok', 'ok', 'none', 'multi', 'turn', 'gaze', 'phone'])
+        faces = {'none': 0, 'multi': 2}.get(mode, 1)
+        angle = rng.uniform(50, 80) if mode == 'turn' else rng.uniform(-20, 20)
+        gaze  = rng.uniform(0.75, 0.95) if mode == 'gaze' else rng.uniform(0.4, 0.6)
+        dets  = np.array([[10, 10, 50, 50, 0.9, PHONE]] if mode == 'phone' else [], np.float32).reshape(-1, 6)
+        frames.append((faces, angle, gaze, dets))
+    return frames
+
+
+def process(engine, state, frame, tracker):
+    """One frame's worth of shared-state mutation, like ``_process_frame``."""
+    tracker.enter(state)
+    try:
+        faces, angle, gaze, dets = frame
+        face_res = FaceResult(faces, landmarks(angle, gaze) if faces == 1 else None)
+        hit = engine.evaluate(state['counters'], FrameSignals(face_res, lambda: FrameDetections(dets, NAMES)))
+        n = state['frames']
+        time.sleep(0)  # yield mid-update: a lost update shows up if frames overlap
+        state['frames'] = n + 1
+        state['fired'].append(hit.rule.name if hit else None)
+    finally:
+        tracker.leave(state)
+
+
+class Tracker:
+    def __init__(self):
+        self.lock, self.active, self.peak, self.overlaps = threading.Lock(), 0, 0, 0
+
+    def enter(self, state):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            state['running'] += 1
+            self.overlaps += state['running'] > 1
+
+    def leave(self, state):
+        with self.lock:
+            self.active -= 1
+            state['running'] -= 1
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--students', type=int, default=64)
+    ap.add_argument('--frames', type=int, default=300, help='frames per student')
+    ap.add_argument('--workers', type=int, default=8)
+    ap.add_argument('--submitters', type=int, default=16, help='concurrent request threads')
+    ap.add_argument('--no-executor', action='store_true', help='one thread per frame (the old behaviour)')
+    args = ap.parse_args()
+
+    engine = RuleEngine(default_rules())
+    seqs   = {f's{i}': make_frames(i, args.frames) for i in range(args.students)}
+
+    expected = {}
+    for sid, frames in seqs.items():
+        state = {'counters': engine.counters(), 'frames': 0, 'fired': [], 'running': 0}
+        for frame in frames:
+            process(engine, state, frame, Tracker())
+        expected[sid] = state['fired']
+
+    states  = {sid: {'counters': engine.counters(), 'frames': 0, 'fired': [], 'running': 0} for sid in seqs}
+    tracker = Tracker()
+    executor = None if args.no_executor else StudentExecutor(args.workers)
+    # frame k of every student is submitted before frame k+1, from many threads at once
+    jobs  = [(sid, k) for k in range(args.frames) for sid in seqs]
+    lock  = threading.Lock()
+    waits = []
+
+    def submitter(part):
+        for sid, k in part:
+            if executor:
+                with lock:  # fixes the per-student submission order
+                    fut = executor.submit(sid, process, engine, states[sid], seqs[sid][k], tracker)
+                waits.append(fut)
+            else:
+                t = threading.Thread(target=process, args=(engine, states[sid], seqs[sid][k], tracker))
+                t.start()
+                waits.append(t)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=submitter, args=(jobs[i::args.submitters],)) for i in range(args.submitters)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for w in waits:
+        w.result() if executor else w.join()
+    elapsed = time.perf_counter() - t0
+
+    total       = args.students * args.frames
+    counted     = sum(s['frames'] for s in states.values())
+    mismatched  = [sid for sid in seqs if states[sid]['fired'] != expected[sid]]
+    n_verdicts  = sum(f is not None for fired in expected.values() for f in fired)
+    checks = [
+        (f"verdict sequences match the sequential run ({n_verdicts} verdicts)", not mismatched,
+         f"{len(mismatched)} students differ"),
+        ("no student ran two frames at once", tracker.overlaps == 0, f"{tracker.overlaps} overlaps"),
+        (f"frame counters add up to {total}", counted == total, f"counted {counted}"),
+    ]
+    if executor:
+        checks.append((f"at most {args.workers} frames at once", tracker.peak <= args.workers,
+                       f"peak {tracker.peak}"))
+    print(f"{args.students} students x {args.frames} frames, {args.submitters} submitters, "
+          f"{'one thread per frame' if args.no_executor else f'{args.workers} workers'}: "
+          f"{total / elapsed:.0f} frames/s, peak concurrency {tracker.peak}")
+    for label, ok, detail in checks:
+        print(f"  {'✅' if ok else '❌'} {label}" + ('' if ok else f" - {detail}"))
+    if not all(ok for _, ok, _ in checks):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Per-frame pixel work of the shared preprocessing stage, and its effect on
+detection.
+
+Compares, on the same webcam JPEGs, the old path (full-resolution
+``cvtColor`` + the detector's letterbox of the full frame) with the shared
+downscaled RGB buffer (``preprocess.to_rgb``) and a letterbox built from
+it, reporting per-stage time and megapixels touched per frame.  With
+``--backend`` it also runs the detector on both inputs - and, when
+MediaPipe is installed, on the face-guided desk crop (``--roi``) - and
+prints how often the phone/object verdicts agree with the full-frame run.
+
+    cd camera-detection
+    python -m benchmarks.preprocessing /data/frames/heldout --max-side 640
+    python -m benchmarks.preprocessing /data/frames/heldout --backend onnx \\
+        --model models/yolov5s-416.onnx --size 416 --roi
+"""
+import argparse, glob, os, time
+import numpy as np, cv2
+
+from detector_backends import letterbox, load_detector
+from preprocess import to_rgb, desk_roi
+from benchmarks.detector_accuracy import as_array, verdicts
+
+
+def load_jpegs(frame_dir, limit):
+    paths = sorted(glob.glob(os.path.join(frame_dir, '*.jp*g')))[:limit]
+    if not paths:
+        raise SystemExit(f"no JPEG frames found in {frame_dir}")
+    out = []
+    for p in paths:
+        with open(p, 'rb') as f:
+            out.append(np.frombuffer(f.read(), np.uint8))
+    return out
+
+
+def timed(fn, frames, repeat):
+    out, t0 = None, time.perf_counter()
+    for _ in range(repeat):
+        out = [fn(f) for f in frames]
+    return out, (time.perf_counter() - t0) / (repeat * len(frames)) * 1000
+
+
+def face_rois(rgbs):
+    """Desk crop per frame from a static-image FaceMesh (None without one face)."""
+    from face_sessions import create_face_mesh
+    mesh, rois = create_face_mesh(static_image_mode=True), []
+    for rgb in rgbs:
+        faces = mesh.process(rgb).multi_face_landmarks or []
+        rois.append(desk_roi(faces[0].landmark, rgb.shape) if len(faces) == 1 else None)
+    mesh.close()
+    return rois
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('frames', help='directory of webcam JPEG frames')
+    ap.add_argument('--max-side', type=int, default=640, help='FRAME_MAX_SIDE')
+    ap.add_argument('--size', type=int, default=640, help='detector input size')
+    ap.add_argument('--backend', help='also compare detections (torch / onnx / openvino)')
+    ap.add_argument('--model', help='exported model for onnx/openvino')
+    ap.add_argument('--roi', action='store_true', help='also run the face-guided desk crop (needs mediapipe)')
+    ap.add_argument('--limit', type=int, default=300)
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+
+    jpegs  = load_jpegs(args.frames, args.limit)
+    bgrs, decode_ms = timed(lambda b: cv2.imdecode(b, cv2.IMREAD_COLOR), jpegs, args.repeat)
+    full, full_ms   = timed(lambda f: cv2.cvtColor(f, cv2.COLOR_BGR2RGB), bgrs, args.repeat)
+    _, full_lb_ms   = timed(lambda f: letterbox(f, args.size), full, args.repeat)
+    small, small_ms = timed(lambda f: to_rgb(f, args.max_side), bgrs, args.repeat)
+    _, small_lb_ms  = timed(lambda f: letterbox(f, args.size), small, args.repeat)
+
+    h, w = bgrs[0].shape[:2]
+    sh, sw = small[0].shape[:2]
+    # pixels read + written per frame: cvtColor, then letterbox (resize read + padded output)
+    mp_full  = (2 * h * w + h * w + args.size ** 2) / 1e6
+    # resize read + write, cvtColor on the small image, letterbox of it
+    mp_small = (h * w + sh * sw + 2 * sh * sw + sh * sw + args.size ** 2) / 1e6
+    print(f"{len(jpegs)} frames {w}x{h} → shared buffer {sw}x{sh}, detector {args.size}px "
+          f"(imdecode {decode_ms:.2f} ms, not counted)\n")
+    print(f"{'path':<28} {'rgb ms':>8} {'letterbox ms':>13} {'total ms':>9} {'MPix':>6}")
+    print(f"{'full-frame cvtColor':<28} {full_ms:8.2f} {full_lb_ms:13.2f} {full_ms + full_lb_ms:9.2f} {mp_full:6.2f}")
+    print(f"{'shared downscaled buffer':<28} {small_ms:8.2f} {small_lb_ms:13.2f} "
+          f"{small_ms + small_lb_ms:9.2f} {mp_small:6.2f}")
+
+    if not args.backend:
+        return
+    model = load_detector(args.backend, args.model, size=args.size, conf=0.5, iou=0.45,
+                          threads=os.cpu_count() or 1)
+    model.warmup()
+    run  = lambda imgs, rois=None: [verdicts(as_array(model(model.prepare(img, roi)).xyxy[0]), model.names)
+                                    for img, roi in zip(imgs, rois or [None] * len(imgs))]
+    ref  = np.array(run(full))
+    rows = [('shared downscaled buffer', run(small), len(small))]
+    if args.roi:
+        rois = face_rois(small)
+        rows.append(('face-guided desk crop', run(small, rois), sum(r is not None for r in rois)))
+    print(f"\n{'detector input':<28} {'phone':>7} {'object':>7}   verdict agreement with the full frame")
+    for name, got, n in rows:
+        agree = np.array(got) == ref
+        print(f"{name:<28} {agree[:, 0].mean():7.1%} {agree[:, 1].mean():7.1%}   ({n} frames)")
+
+
+if __name__ == '__main__':
+    main()
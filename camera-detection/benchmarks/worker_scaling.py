@@ -0,0 +1,102 @@
+"""Throughput scaling of the prefork multi-worker mode.
+
+Starts camera_server.py once per worker count, drives it with N simulated
+students posting JPEG frames back-to-back, and prints frames/s and p50/p99
+latency of the frames the server actually analysed for each run; frames
+shed by admission control (503 busy, superseded) are counted separately.  Run it on the many-core box you want to size.
+
+    cd camera-detection
+    JWT_SECRET=... python -m benchmarks.worker_scaling --workers 1 2 4 8 --students 64
+"""
+import argparse, os, subprocess, sys, tempfile, threading, time
+import numpy as np, cv2, jwt, requests
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def synthetic_jpeg(seed):
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    return cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes()
+
+
+def wait_ready(url, timeout=300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f'{url}/ready', timeout=2).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    raise RuntimeError('server did not come up')
+
+
+def drive(url, secret, students, frames, jpegs):
+    latencies, counts, lock = [], {'errors': 0, 'shed': 0}, threading.Lock()
+
+    def student(i):
+        token = jwt.encode({'userId': f'bench-{i}', 'role': 'student'}, secret, algorithm='HS256')
+        http  = requests.Session()
+        local = []
+        for n in range(frames):
+            t0 = time.perf_counter()
+            try:
+                resp = http.post(f'{url}/process_frame', data=jpegs[(i + n) % len(jpegs)], timeout=60,
+                                 headers={'Content-Type': 'image/jpeg', 'Authorization': f'Bearer {token}',
+                                          'X-Exam-Id': 'bench'})
+                status = resp.json().get('status') if resp.headers.get('Content-Type', '').startswith(
+                    'application/json') else None
+                outcome = 'shed' if status in ('busy', 'superseded') else None if resp.ok else 'errors'
+            except requests.RequestException:
+                outcome = 'errors'
+            if outcome is None:
+                local.append(time.perf_counter() - t0)
+            else:
+                with lock:
+                    counts[outcome] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=student, args=(i,)) for i in range(students)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, np.array(latencies) * 1000, counts['errors'], counts['shed']
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    ap.add_argument('--students', type=int, default=64)
+    ap.add_argument('--frames', type=int, default=20, help='frames per student')
+    ap.add_argument('--port', type=int, default=5001)
+    args = ap.parse_args()
+
+    secret = os.getenv('JWT_SECRET')
+    if not secret:
+        sys.exit('JWT_SECRET must be set (the same one the server uses)')
+    jpegs = [synthetic_jpeg(i) for i in range(16)]
+    url   = f'http://127.0.0.1:{args.port}'
+
+    print(f"{args.students} students x {args.frames} frames, {os.cpu_count()} CPUs")
+    for n in args.workers:
+        env = dict(os.environ, WORKERS=str(n), NODE_BACKEND=os.getenv('NODE_BACKEND', 'http://127.0.0.1:9'),
+                   EVIDENCE_SPOOL_DIR=tempfile.mkdtemp(prefix='bench-spool-'))
+        server = subprocess.Popen([sys.executable, 'camera_server.py'], cwd=HERE, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_ready(url)
+            elapsed, lat, errors, shed = drive(url, secret, args.students, args.frames, jpegs)
+            pct = lambda q: np.percentile(lat, q) if len(lat) else float('nan')
+            print(f"workers={n:<3} {len(lat) / elapsed:8.1f} fps   p50 {pct(50):7.1f} ms   "
+                  f"p99 {pct(99):7.1f} ms   errors {errors}   shed {shed}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
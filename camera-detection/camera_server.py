@@ -1,8 +1,25 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+from flask_sock import Sock
+from simple_websocket import ConnectionClosed
 from dotenv import load_dotenv
-import os, torch, jwt, time, threading, collections, base64
-import numpy as np, mediapipe as mp, requests, io, imageio, math, warnings, cv2
+import os, jwt, time, threading, collections, base64, json, importlib, traceback
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np, io, warnings, cv2, imageio_ffmpeg
+from batcher import InferenceBatcher
+from detector_backends import load_detector
+from motion_gate import DetectionGate, gate_stats
+from face_sessions import FaceMeshSession, cascade_stats
+from preprocess import to_rgb, desk_roi
+from readiness import Readiness
+from admission import AdmissionController, ADMITTED, BUSY
+from executor import StudentExecutor
+from rules import RuleEngine, FrameSignals, default_rules, DEFAULT_DURATIONS, LOG
+from metrics import Metrics, SampledProfiler
+from session_store import SessionStore, StudentSession
+from evidence import EvidenceBuffer
+from uploader import EvidenceUploader
+from timeline import SignalTimeline
 
 # ── Load .env ───────────────────────────────
 load_dotenv()
@@ -21,447 +38,510 @@ warnings.filterwarnings(
 )
 
 # ── Ensure FFmpeg for imageio ───────────────
+# Without FFMPEG_PATH imageio-ffmpeg's bundled binary (or PATH) is used;
+# it is located in the background (see "ffmpeg" in /ready), never downloaded
 if FFMPEG_PATH and os.path.isfile(FFMPEG_PATH):
     os.environ['PATH'] += os.pathsep + os.path.dirname(FFMPEG_PATH)
     os.environ['IMAGEIO_FFMPEG_EXE'] = FFMPEG_PATH
-else:
-    try:
-        import imageio.plugins.ffmpeg as ffmpeg_plugin
-        ffmpeg_plugin.download()
-    except Exception:
-        print("⚠️ Warning: FFmpeg not found or auto-download failed; ensure it's on PATH.")
 
 app = Flask(__name__)
 CORS(app)
+sock = Sock(app)
+
+# ── Workers ─────────────────────────────────
+# WORKERS>1 forks that many processes after the models are loaded (see workers.py)
+WORKERS              = int(os.getenv('WORKERS', 1))
+WORKER_BASE_PORT     = int(os.getenv('WORKER_BASE_PORT', 5101))
+
+# Each worker process gets CPU_BUDGET cores (cores // WORKERS by default),
+# split between the detector's intra-op pool (TORCH_THREADS // WORKERS,
+# half the budget by default) and face analysis on the student actors
+# (STUDENT_CPU_SLOTS, the rest).  OpenCV's own pool is capped (CV2_THREADS)
+CPU_BUDGET           = int(os.getenv('CPU_BUDGET', max(1, (os.cpu_count() or 1) // WORKERS)))
+TORCH_THREADS        = int(os.getenv('TORCH_THREADS', max(1, CPU_BUDGET // 2) * WORKERS))
+DETECTOR_THREADS     = max(1, TORCH_THREADS // WORKERS)
+STUDENT_CPU_SLOTS    = int(os.getenv('STUDENT_CPU_SLOTS', max(1, CPU_BUDGET - DETECTOR_THREADS)))
+CV2_THREADS          = int(os.getenv('CV2_THREADS', 1))
+cv2.setNumThreads(CV2_THREADS)
+
+# ── Metrics ─────────────────────────────────
+# Prometheus text on /metrics; PROFILE_SAMPLE_RATE>0 runs that fraction of
+# YOLO batches and FaceMesh calls under cProfile (see /profile)
+PROFILE_SAMPLE_RATE  = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+METRICS_PER_STUDENT  = os.getenv('METRICS_PER_STUDENT', '1') == '1'   # per-student fps gauge
+metrics  = Metrics()
+profiler = SampledProfiler(PROFILE_SAMPLE_RATE)
+STAGE_SECONDS = metrics.histogram('proctor_stage_seconds', 'Latency of each frame pipeline stage', ['stage'])
+FRAMES_TOTAL  = metrics.counter('proctor_frames_total', 'Frames processed by outcome', ['mode', 'status'])
+CHEATS_TOTAL  = metrics.counter('proctor_cheat_verdicts_total', 'Cheat verdicts by reason', ['mode', 'reason'])
+
+def timed_model(fn, stage):
+    """Wrap a model call so every call is timed and a sample is profiled"""
+    def call(*args, **kwargs):
+        with STAGE_SECONDS.time(stage):
+            return profiler.call(stage, fn, *args, **kwargs)
+    return call
 
 # ── Load YOLOv5 ─────────────────────────────
-model = torch.hub.load('ultralytics/yolov5', 'yolov5s', pretrained=True)
-model.conf, model.iou = 0.5, 0.45
-_ = model(np.zeros((640, 640, 3), dtype=np.uint8), size=640)
-
-# ── MediaPipe Face Mesh ─────────────────────
-mp_face   = mp.solutions.face_mesh
-
-# Create face mesh instances per student to avoid timestamp conflicts
-def create_face_mesh():
-    return mp_face.FaceMesh(
-        static_image_mode=True,  # Changed to True to avoid timestamp issues
-        max_num_faces=2,
-        refine_landmarks=True,
-        min_detection_confidence=0.5
-    )
-
-# Store face mesh instances per student
-face_mesh_instances = {}
+# DETECTOR_BACKEND: torch (eager, torch.hub) | onnx | openvino; the latter two
+# run a graph exported by export_detector.py (DETECTOR_MODEL, FP32 or INT8).
+# For torch, DETECTOR_REPO (+ DETECTOR_MODEL as .pt) loads vendored weights
+# offline (vendor_models.py); unset, torch.hub fetches them from GitHub
+DETECTOR_BACKEND     = os.getenv('DETECTOR_BACKEND', 'torch').lower()
+DETECTOR_MODEL       = os.getenv('DETECTOR_MODEL')
+DETECTOR_REPO        = os.getenv('DETECTOR_REPO')
+DETECTOR_INPUT_SIZE  = int(os.getenv('DETECTOR_INPUT_SIZE', 640))    # 320 / 416 / 640
+
+if DETECTOR_INPUT_SIZE % 32:
+    raise RuntimeError("DETECTOR_INPUT_SIZE must be a multiple of 32 (320, 416 or 640)")
+
+model = load_detector(DETECTOR_BACKEND, DETECTOR_MODEL, size=DETECTOR_INPUT_SIZE, conf=0.5, iou=0.45,
+                      threads=DETECTOR_THREADS, repo=DETECTOR_REPO)
+print(f"🧠 Detector backend: {DETECTOR_BACKEND} @ {DETECTOR_INPUT_SIZE}px"
+      + (f" ({DETECTOR_MODEL})" if DETECTOR_MODEL else ""))
+
+# ── Face analysis ──────────────────────────
+# FACE_CASCADE=1 counts faces with MediaPipe face detection and runs the
+# refined FaceMesh only on single-face frames, every LANDMARK_EVERY-th one
+# (every frame while a head-turn/gaze streak is building)
+FACE_CASCADE         = os.getenv('FACE_CASCADE', '0') == '1'
+LANDMARK_EVERY       = int(os.getenv('LANDMARK_EVERY', 1))
+
+# ── Model readiness ─────────────────────────
+# Flask binds immediately; models load and warm up in the background and
+# /ready turns 200 once the required ones answer
+readiness = Readiness()
+readiness.add('detector')
+readiness.add('face_mesh')
+readiness.add('ffmpeg', required=False)  # only needed for evidence clips
+
+def warmup_face_mesh():
+    session = FaceMeshSession(FACE_CASCADE, LANDMARK_EVERY)
+    try:
+        session.warmup()
+    finally:
+        session.close()
+
+def load_models():
+    readiness.load('detector', model.load)  # no-op if loaded before the fork
+    readiness.warm('detector', model.warmup)
+    readiness.load('face_mesh', lambda: importlib.import_module('mediapipe'))
+    readiness.warm('face_mesh', warmup_face_mesh)
+    readiness.load('ffmpeg', imageio_ffmpeg.get_ffmpeg_exe)
+    readiness.warm('ffmpeg')
+    if readiness.ready():
+        print(f"✅ Models ready: {json.dumps(readiness.snapshot()['models'])}")
+
+def start_models():
+    threading.Thread(target=load_models, name='model-warmup', daemon=True).start()
+
+if WORKERS <= 1:
+    start_models()
+elif model.fork_safe:
+    # load once in the parent and share the weights copy-on-write; each
+    # prefork worker warms up after the fork (on_worker_start)
+    readiness.load('detector', model.load)
+
+def models_loading():
+    return jsonify({"error": "Models are still loading", **readiness.snapshot()}), 503, {'Retry-After': '2'}
+
+# Frames from concurrent requests are grouped into one forward pass
+YOLO_BATCH_SIZE      = int(os.getenv('YOLO_BATCH_SIZE', 8))
+YOLO_BATCH_WAIT_MS   = float(os.getenv('YOLO_BATCH_WAIT_MS', 10))
+detector = InferenceBatcher(timed_model(model, 'yolo_batch'), max_batch=YOLO_BATCH_SIZE,
+                            max_wait_ms=YOLO_BATCH_WAIT_MS, size=DETECTOR_INPUT_SIZE)
+
+# Frames run on per-student actors (executor.py): one at a time and in
+# order per student, different students in parallel.  At most
+# STUDENT_CPU_SLOTS compute at once; an actor waiting for its YOLO batch
+# gives its slot back, so STUDENT_WORKERS threads default to the slots
+# plus one full batch of waiters
+STUDENT_WORKERS      = int(os.getenv('STUDENT_WORKERS', STUDENT_CPU_SLOTS + YOLO_BATCH_SIZE))
+executor = StudentExecutor(STUDENT_WORKERS, STUDENT_CPU_SLOTS)
+
+# ── Admission control ──────────────────────
+# One frame per student in flight (a newer frame supersedes one still
+# waiting), a global cap answered with a fast "busy", and a suggested send
+# interval in every response that stretches as the server fills up
+MAX_INFLIGHT_FRAMES  = int(os.getenv('MAX_INFLIGHT_FRAMES', 4 * (os.cpu_count() or 1)))
+STUDENT_MAX_INFLIGHT = int(os.getenv('STUDENT_MAX_INFLIGHT', 1))
+FRAME_INTERVAL_MS    = int(os.getenv('FRAME_INTERVAL_MS', 1000))      # client pace when idle
+MAX_FRAME_INTERVAL_MS = int(os.getenv('MAX_FRAME_INTERVAL_MS', 5000)) # ... and when saturated
+ADMISSION_TARGET_LOAD = float(os.getenv('ADMISSION_TARGET_LOAD', 0.5))  # start slowing clients down
+ADMISSION_WAIT_S     = float(os.getenv('ADMISSION_WAIT_S', 2))
+# Per-exam base interval, e.g. EXAM_FRAME_INTERVAL_MS='{"practice": 2000, "<examId>": 1500}'
+EXAM_FRAME_INTERVAL_MS = json.loads(os.getenv('EXAM_FRAME_INTERVAL_MS', '{}'))
+admission = AdmissionController(MAX_INFLIGHT_FRAMES, STUDENT_MAX_INFLIGHT, FRAME_INTERVAL_MS,
+                                MAX_FRAME_INTERVAL_MS, ADMISSION_TARGET_LOAD, ADMISSION_WAIT_S)
 
 # ── Globals & counters ──────────────────────
 FRAME_BUFFER         = collections.deque(maxlen=150)
 CHEAT_LOCK           = threading.Lock()
-cheated_recently     = {}  # Changed to dict to track per student
-
-# Per-student counters (dict of student_id -> counter)
-student_counters = {}
+cheated_recently     = {}  # student_exam key -> cooldown deadline (time.monotonic())
+CHEAT_COOLDOWN_S     = float(os.getenv('CHEAT_COOLDOWN_S', 5))
+
+# ── Evidence upload ─────────────────────────
+CLIP_WORKERS         = int(os.getenv('CLIP_WORKERS', 2))
+SEGMENT_WORKERS      = int(os.getenv('SEGMENT_WORKERS', 2))          # background clip encoders
+CLIP_SEGMENT_SECONDS = float(os.getenv('CLIP_SEGMENT_SECONDS', 5))
+SEGMENT_MAX_INFLIGHT = int(os.getenv('SEGMENT_MAX_INFLIGHT', 1))     # per student; a slow pool grows the next segment
+UPLOAD_WORKERS       = int(os.getenv('UPLOAD_WORKERS', 2))
+EVIDENCE_SPOOL_DIR   = os.getenv('EVIDENCE_SPOOL_DIR',
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), 'spool'))
+clip_pool    = ThreadPoolExecutor(max_workers=CLIP_WORKERS, thread_name_prefix='clip')
+segment_pool = ThreadPoolExecutor(max_workers=SEGMENT_WORKERS, thread_name_prefix='segment')
+UPLOAD_TOKEN_TTL_S   = int(os.getenv('UPLOAD_TOKEN_TTL_S', 300))
+
+def refresh_upload_token(auth_header):
+    """Re-sign an expired student token (same userId/role, short expiry) so
+    spooled evidence still uploads after an outage longer than its lifetime"""
+    token = auth_header.split()[-1]
+    payload = jwt.decode(token, SECRET, algorithms=['HS256'], options={'verify_exp': False})
+    payload['exp'] = int(time.time()) + UPLOAD_TOKEN_TTL_S
+    return f"Bearer {jwt.encode(payload, SECRET, algorithm='HS256')}"
+
+uploader  = EvidenceUploader(f'{NODE_BACKEND}/api/cheats', EVIDENCE_SPOOL_DIR, workers=UPLOAD_WORKERS,
+                             on_upload=lambda seconds: STAGE_SECONDS.observe(seconds, 'upload'),
+                             reauth=refresh_upload_token)
 
 # ── Thresholds ─────────────────────────────
-NO_FACE_FRAMES       = 8       # no face ≥8 frames
-MULTI_FACE_FRAMES    = 5       # >1 face ≥5 frames
-HEAD_TURN_FRAMES     = 8       # head-turn ≥8 frames
-HEAD_TURN_ANGLE      = 45      # flag if |angle| >45°
-OBJ_DET_FRAMES       = 2       # generic objects ≥2 frames
-GAZE_FRAMES          = 8       # gaze-aversion ≥8 frames
-PHONE_FRAMES         = 5       # phone ≥5 consecutive frames
-PHONE_CONF_THRESH    = 0.6     # YOLO conf ≥60%
-GAZE_RATIO_MIN       = 0.3
-GAZE_RATIO_MAX       = 0.7
-OBJECT_CLASSES       = ['laptop', 'book', 'tablet', 'remote']  # phone separate
+# The rule thresholds live in rules.default_rules / DEFAULT_DURATIONS,
+# shared with reanalyze.py; RULE_THRESHOLDS overrides any of them, e.g.
+# RULE_THRESHOLDS='{"head_turn_angle": 35, "phone_conf": 0.5}'
+RULE_THRESHOLDS      = json.loads(os.getenv('RULE_THRESHOLDS', '{}'))
+MOTION_THRESH        = float(os.getenv('MOTION_THRESH', 4.0))    # re-run YOLO if thumbnail diff >4/255
+YOLO_KEYFRAME_FRAMES = int(os.getenv('YOLO_KEYFRAME_FRAMES', 4))  # reuse detections ≤4 frames in a row
+
+# DEBOUNCE_MODE=time debounces on how long a hit lasted, using the client's
+# capture timestamps, so lowering an exam's frame rate keeps the rules'
+# meaning; at 1 fps the durations equal the frame counts
+DEBOUNCE_MODE        = os.getenv('DEBOUNCE_MODE', 'time')           # time | frames
+DEBOUNCE_MAX_GAP_S   = float(os.getenv('DEBOUNCE_MAX_GAP_S', 3))      # or 2.5x the paced interval; longer gaps end a streak
+DEBOUNCE_TOLERANCE_S = float(os.getenv('DEBOUNCE_TOLERANCE_S', 0.25)) # capture-time jitter
+
+# One rule set for exam and practice mode, evaluated cheapest signal first
+if DEBOUNCE_MODE == 'time':
+    RULE_THRESHOLDS.setdefault('durations', DEFAULT_DURATIONS)
+rule_engine = RuleEngine(default_rules(**RULE_THRESHOLDS))
+
+# ── Per-student sessions ───────────────────
+SESSION_IDLE_TTL     = float(os.getenv('SESSION_IDLE_TTL', 600))  # evict after 10 min without frames
+MAX_SESSIONS         = int(os.getenv('MAX_SESSIONS', 500))         # then least recently used
+EVIDENCE_MAX_FRAMES  = int(os.getenv('EVIDENCE_MAX_FRAMES', 150))
+EVIDENCE_MAX_BYTES   = int(os.getenv('EVIDENCE_MAX_BYTES', 12 * 1024 * 1024))  # encoded JPEG bytes
+
+def new_student_session(student_id):
+    """Fresh counters plus a tracking-mode FaceMesh graph for one student"""
+    counters = {
+        **rule_engine.counters(DEBOUNCE_MAX_GAP_S, FRAME_INTERVAL_MS / 1000),
+        'FRAME_BUFFER': EvidenceBuffer(EVIDENCE_MAX_FRAMES, EVIDENCE_MAX_BYTES,
+                                       encoder_pool=segment_pool, segment_seconds=CLIP_SEGMENT_SECONDS,
+                                       max_encoding=SEGMENT_MAX_INFLIGHT),
+        'DETECTION_GATE': DetectionGate(MOTION_THRESH, YOLO_KEYFRAME_FRAMES)
+    }
+    return StudentSession(student_id, counters, FaceMeshSession(FACE_CASCADE, LANDMARK_EVERY))
+
+def forget_cheat_flags(student_id):
+    with CHEAT_LOCK:
+        keys_to_remove = [key for key in cheated_recently.keys() if key.startswith(f"{student_id}_")]
+        for key in keys_to_remove:
+            del cheated_recently[key]
+
+sessions = SessionStore(new_student_session, SESSION_IDLE_TTL, MAX_SESSIONS, on_evict=forget_cheat_flags)
+
+# Signal timelines per student_exam, kept after the session ends for review
+TIMELINE_TTL         = float(os.getenv('TIMELINE_TTL', 6 * 3600))
+MAX_TIMELINES        = int(os.getenv('MAX_TIMELINES', 2000))
+TIMELINE_CLASSES     = list(dict.fromkeys(c for r in rule_engine.rules for c in r.classes))
+timelines = SessionStore(lambda key: SignalTimeline(TIMELINE_CLASSES), TIMELINE_TTL, MAX_TIMELINES,
+                         label='timeline')
 
 def get_student_counters(student_id):
     """Get or create counters for a specific student"""
-    if student_id not in student_counters:
-        student_counters[student_id] = {
-            'NO_FACE_COUNTER': 0,
-            'MULTI_FACE_COUNTER': 0,
-            'HEAD_TURN_COUNTER': 0,
-            'GAZE_COUNTER': 0,
-            'OBJECT_COUNTER': 0,
-            'PHONE_COUNTER': 0,
-            'FRAME_BUFFER': collections.deque(maxlen=150)
-        }
-    
-    # Create face mesh instance for this student if not exists
-    if student_id not in face_mesh_instances:
-        face_mesh_instances[student_id] = create_face_mesh()
-    
-    return student_counters[student_id]
-
-def head_pose(landmarks):
-    l, r = landmarks[33], landmarks[263]
-    return math.degrees(math.atan2(r.y - l.y, r.x - l.x))
-
-def handle_cheat(student_id, exam_id, token_header, reason):
-    """Handle cheat detection and upload video clip"""
-    student_key = f"{student_id}_{exam_id}"
-    
-    # Check if already processing cheat for this student
-    with CHEAT_LOCK:
-        if cheated_recently.get(student_key, False):
-            return
-        cheated_recently[student_key] = True
-    
-    counters = get_student_counters(student_id)
-    frames = list(counters['FRAME_BUFFER'])
-    
-    if not frames:
-        # No delay here - immediate cleanup
-        with CHEAT_LOCK:
-            cheated_recently[student_key] = False
-        return
-
-    buf    = io.BytesIO()
-    writer = imageio.get_writer(buf, format='mp4', mode='I', fps=20)
-    for frame in frames:
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        writer.append_data(rgb)
-    writer.close()
-    buf.seek(0)
-    clip_data = buf.read()
-    buf.close()
+    return sessions.get(student_id).counters
+
+def release_student(student_id):
+    """Drop all per-student state (counters, face mesh, cheat flags)"""
+    sessions.pop(student_id)
+    forget_cheat_flags(student_id)
+
+metrics.gauge('proctor_active_sessions', 'Live per-student sessions', lambda: len(sessions))
+metrics.gauge('proctor_upload_queue_depth', 'Clips queued for upload', lambda: uploader.queue.qsize())
+metrics.gauge('proctor_upload_in_flight', 'Clip uploads in progress', lambda: uploader.in_flight)
+metrics.gauge('proctor_yolo_queue_depth', 'Frames waiting for a YOLO batch', lambda: detector.stats()['queued'])
+metrics.gauge('proctor_admission_in_flight', 'Frames running or waiting for a slot',
+              lambda: admission.stats()['in_flight'])
+metrics.gauge('proctor_executor_pending', 'Frames queued or running on student actors',
+              lambda: executor.stats()['pending'])
+metrics.gauge('proctor_next_interval_ms', 'Frame interval currently suggested to clients',
+              admission.next_interval_ms)
+if METRICS_PER_STUDENT:
+    metrics.gauge('proctor_student_fps', 'Smoothed frame rate per student',
+                  lambda: {(sid,): round(s.fps, 2) for sid, s in sessions.items()}, ['student'])
+
+# ── Frame decoding ─────────────────────────
+# Decode at 1/2, 1/4 or 1/8 resolution; the detectors don't need full 720p
+FRAME_DECODE_REDUCE  = int(os.getenv('FRAME_DECODE_REDUCE', 1))
+DECODE_FLAGS         = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# One downscaled RGB buffer per frame, shared by FaceMesh, the motion gate
+# and YOLO; DETECTOR_ROI=1 crops YOLO's input to the hands/desk region
+# around a single detected face (full frame otherwise)
+FRAME_MAX_SIDE       = int(os.getenv('FRAME_MAX_SIDE', 640))         # 0 = keep decoded size
+DETECTOR_ROI         = os.getenv('DETECTOR_ROI', '0') == '1'
+
+def decode_frame(frame_bytes):
+    """Decode JPEG bytes to a BGR frame (None if empty or invalid)"""
+    if not frame_bytes:
+        return None
+    nparr = np.frombuffer(frame_bytes, np.uint8)
+    with STAGE_SECONDS.time('imdecode'):
+        return cv2.imdecode(nparr, DECODE_FLAGS.get(FRAME_DECODE_REDUCE, cv2.IMREAD_COLOR))
+
+def read_frame_clock():
+    """Client capture time (seconds) and sequence number of a frame request.
+
+    Sent as ``X-Frame-Ts`` (epoch ms) / ``X-Frame-Seq`` headers, or as
+    ``ts`` / ``seq`` in the JSON body; (None, None) if absent or malformed.
+    """
+    ts, seq = request.headers.get('X-Frame-Ts'), request.headers.get('X-Frame-Seq')
+    if ts is None and request.mimetype == 'application/json':
+        data = request.get_json(silent=True) or {}
+        ts, seq = data.get('ts'), data.get('seq')
+    try:
+        ts = float(ts) / 1000 if ts is not None else None
+        seq = int(seq) if seq is not None else None
+    except (TypeError, ValueError):
+        return None, None
+    return ts, seq
+
+def read_frame_request():
+    """Return (raw_token, exam_id, frame_bytes) for a frame request.
+
+    Accepts a raw ``image/jpeg`` body or ``multipart/form-data`` (field
+    ``frame``) with the token in ``Authorization`` and the exam id in
+    ``X-Exam-Id``, or the legacy JSON body carrying a base64 data URL.
+    """
+    if request.mimetype == 'image/jpeg':
+        return (request.headers.get('Authorization'),
+                request.headers.get('X-Exam-Id'),
+                request.get_data(cache=False))
+
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('frame')
+        return (request.headers.get('Authorization') or request.form.get('token'),
+                request.headers.get('X-Exam-Id') or request.form.get('exam'),
+                upload.read() if upload else None)
+
+    data = request.get_json()
+    frame_data = data.get('frame')
+    try:
+        with STAGE_SECONDS.time('b64decode'):
+            frame_bytes = base64.b64decode(frame_data.split(',')[1]) if frame_data else None
+    except Exception:
+        frame_bytes = b''  # present but malformed → "Invalid frame data"
+    return data.get('token'), data.get('exam'), frame_bytes
 
+def handle_cheat(evidence, parts, student_id, exam_id, token_header, reason):
+    """Assemble the evidence clip and hand it to the upload pipeline"""
     try:
-        print(f"📤 Uploading cheat evidence for student {student_id}: {reason}")
-        resp = requests.post(
-            f'{NODE_BACKEND}/api/cheats',
-            files={'clip': ('cheat.mp4', clip_data, 'video/mp4')},
-            data={'studentId': student_id, 'examId': exam_id, 'reason': reason},
-            headers={'Authorization': token_header},
-            timeout=10
+        # recent segments are already encoded; this only encodes the tail and remuxes
+        with STAGE_SECONDS.time('clip_build'):
+            clip_data = evidence.build_clip(parts)
+
+        if not clip_data:
+            print(f"⚠️ No evidence buffered for student {student_id}: {reason}")
+            return
+
+        print(f"📤 Queueing cheat evidence for student {student_id}: {reason}")
+        uploader.submit(
+            clip_data,
+            {'studentId': student_id, 'examId': exam_id, 'reason': reason},
+            token_header
         )
-        print(f"✅ [handle_cheat] POST /api/cheats → {resp.status_code}", resp.text)
     except Exception as e:
-        print("❌ Cheat upload error:", e)
-    finally:
-        # Reduced delay from 10 seconds to 2 seconds for faster recovery
-        time.sleep(2)
-        with CHEAT_LOCK:
-            cheated_recently[student_key] = False
+        # runs on the clip pool, whose futures nobody waits on
+        print(f"❌ Cheat evidence lost for student {student_id} ({reason}): {e}")
+        traceback.print_exc()
+
+def report_cheat(evidence, student_id, exam_id, token_header, reason):
+    """Start the cooldown and build/upload the clip on the bounded clip pool.
 
-def process_frame(student_id, exam_id, token_header, frame_data):
-    """Process a single frame for AI detection"""
+    The clip is cut from the student's buffer as it is now, so a cleanup or
+    eviction before the clip pool gets to it can't drop the evidence.
+    """
     student_key = f"{student_id}_{exam_id}"
-    counters = get_student_counters(student_id)
-    
-    # Check if already processing cheat for this student
+    now = time.monotonic()
     with CHEAT_LOCK:
-        if cheated_recently.get(student_key, False):
-            return {"status": "processing"}
-    
-    try:
-        # Decode base64 frame
-        frame_bytes = base64.b64decode(frame_data.split(',')[1])
-        nparr = np.frombuffer(frame_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if frame is None:
-            return {"status": "error", "message": "Invalid frame data"}
-        
-        counters['FRAME_BUFFER'].append(frame.copy())
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Get student-specific face mesh instance
-        student_face_mesh = face_mesh_instances[student_id]
-        
-        # Process with MediaPipe face detection with error handling
+        if cheated_recently.get(student_key, 0) > now:
+            return
+        cheated_recently[student_key] = now + CHEAT_COOLDOWN_S
+    clip_pool.submit(handle_cheat, evidence, evidence.clip_parts(), student_id, exam_id, token_header, reason)
+
+def detect_objects(rgb, roi=None):
+    """Batched YOLO detections for one frame (queueing included)"""
+    with STAGE_SECONDS.time('letterbox'):
+        prepared = model.prepare(rgb, roi)
+    with STAGE_SECONDS.time('yolo'), executor.waiting():
+        return detector.infer(prepared)
+
+def process_frame(student_id, exam_id, token_header, frame_bytes, practice=False, ts=None, seq=None):
+    """Process a single frame for AI detection, counting its outcome"""
+    mode = 'practice' if practice else 'exam'
+    with STAGE_SECONDS.time('frame_total'):
+        result = _process_frame(student_id, exam_id, token_header, frame_bytes, practice, ts, seq)
+    FRAMES_TOTAL.inc(mode, result['status'])
+    if result['status'] in ('cheat_detected', 'logged'):
+        CHEATS_TOTAL.inc(mode, result['reason'])
+    return result
+
+def frame_interval_ms(exam_id):
+    """The exam's configured client frame interval when the server is idle"""
+    return EXAM_FRAME_INTERVAL_MS.get(exam_id, FRAME_INTERVAL_MS)
+
+def admit_frame(student_id, exam_id, token_header, frame_bytes, practice=False, ts=None, seq=None):
+    """``process_frame`` behind admission control; returns (result, HTTP status).
+
+    Refused and superseded frames never reach the rules, so the debounce
+    counters only ever count frames that were actually analysed.
+    """
+    started = time.monotonic()
+    outcome = admission.enter(student_id)
+    if outcome == ADMITTED:
         try:
-            mp_res = student_face_mesh.process(rgb)
-        except Exception as mp_error:
-            print(f"MediaPipe processing error for student {student_id}: {mp_error}")
-            # Create a new face mesh instance if there's an error
-            face_mesh_instances[student_id] = create_face_mesh()
-            student_face_mesh = face_mesh_instances[student_id]
-            try:
-                mp_res = student_face_mesh.process(rgb)
-            except Exception as mp_error2:
-                print(f"MediaPipe processing failed again for student {student_id}: {mp_error2}")
-                return {"status": "error", "message": "MediaPipe processing failed"}
-
-        # Debug output for detection status
-        detection_status = {
-            'faces_detected': len(mp_res.multi_face_landmarks) if mp_res.multi_face_landmarks else 0,
-            'student_id': student_id,
-            'frame_size': f"{frame.shape[1]}x{frame.shape[0]}"
-        }
-
-        # ── Face checks ────────────────────────
-        if mp_res.multi_face_landmarks:
-            counters['NO_FACE_COUNTER'] = 0
-
-            # multiple faces debounce
-            if len(mp_res.multi_face_landmarks) > 1:
-                counters['MULTI_FACE_COUNTER'] += 1
-            else:
-                counters['MULTI_FACE_COUNTER'] = 0
-                
-            if counters['MULTI_FACE_COUNTER'] >= MULTI_FACE_FRAMES:
-                counters['MULTI_FACE_COUNTER'] = 0
-                print(f"🚨 CHEAT DETECTED: Multiple faces - Student {student_id}")
-                threading.Thread(
-                    target=handle_cheat,
-                    args=(student_id, exam_id, token_header, "Multiple faces detected"),
-                    daemon=True
-                ).start()
-                return {"status": "cheat_detected", "reason": "Multiple faces detected"}
-
-            # single-face head-turn & gaze
-            lm = mp_res.multi_face_landmarks[0].landmark
-            angle = head_pose(lm)
-            counters['HEAD_TURN_COUNTER'] = counters['HEAD_TURN_COUNTER'] + 1 if abs(angle) > HEAD_TURN_ANGLE else 0
-            if counters['HEAD_TURN_COUNTER'] >= HEAD_TURN_FRAMES:
-                print(f"🚨 CHEAT DETECTED: Head turned away - Student {student_id}, Angle: {angle:.1f}°")
-                threading.Thread(
-                    target=handle_cheat,
-                    args=(student_id, exam_id, token_header, "Head turned away"),
-                    daemon=True
-                ).start()
-                counters['HEAD_TURN_COUNTER'] = 0
-                return {"status": "cheat_detected", "reason": "Head turned away"}
-
-            iris = [lm[i] for i in (468,469,470,471)]
-            left_x, right_x = min(p.x for p in iris), max(p.x for p in iris)
-            ratio = ((left_x+right_x)/2 - lm[33].x) / (lm[133].x - lm[33].x + 1e-6)
-            counters['GAZE_COUNTER'] = counters['GAZE_COUNTER']+1 if (ratio<GAZE_RATIO_MIN or ratio>GAZE_RATIO_MAX) else 0
-            if counters['GAZE_COUNTER'] >= GAZE_FRAMES:
-                print(f"🚨 CHEAT DETECTED: Gaze averted - Student {student_id}, Ratio: {ratio:.3f}")
-                threading.Thread(
-                    target=handle_cheat,
-                    args=(student_id, exam_id, token_header, "Gaze averted"),
-                    daemon=True
-                ).start()
-                counters['GAZE_COUNTER'] = 0
-                return {"status": "cheat_detected", "reason": "Gaze averted"}
-
-        else:
-            counters['MULTI_FACE_COUNTER'] = 0
-            counters['NO_FACE_COUNTER'] += 1
-            if counters['NO_FACE_COUNTER'] >= NO_FACE_FRAMES:
-                print(f"🚨 CHEAT DETECTED: No face detected - Student {student_id}")
-                threading.Thread(
-                    target=handle_cheat,
-                    args=(student_id, exam_id, token_header, "No face detected"),
-                    daemon=True
-                ).start()
-                counters['NO_FACE_COUNTER'] = 0
-                return {"status": "cheat_detected", "reason": "No face detected"}
-
-        # ── Object & phone detection ─────────────
-        results = model(rgb, size=640)
-
-        # phone debounce + confidence
-        phone_seen = False
-        for *_, conf, cls in results.xyxy[0]:
-            if results.names[int(cls)] == 'cell phone' and conf >= PHONE_CONF_THRESH:
-                counters['PHONE_COUNTER'] += 1
-                phone_seen = True
-                break
-        if not phone_seen:
-            counters['PHONE_COUNTER'] = 0
-
-        if counters['PHONE_COUNTER'] >= PHONE_FRAMES:
-            counters['PHONE_COUNTER'] = 0
-            print(f"🚨 CHEAT DETECTED: Cell phone - Student {student_id}")
-            threading.Thread(
-                target=handle_cheat,
-                args=(student_id, exam_id, token_header, "Cell phone"),
-                daemon=True
-            ).start()
-            return {"status": "cheat_detected", "reason": "Cell phone"}
-
-        # generic objects
-        found, lbl = False, None
-        for *_, _, cls in results.xyxy[0]:
-            if results.names[int(cls)] in OBJECT_CLASSES:
-                found, lbl = True, results.names[int(cls)]
-                break
-
-        counters['OBJECT_COUNTER'] = counters['OBJECT_COUNTER']+1 if found else 0
-        if counters['OBJECT_COUNTER'] >= OBJ_DET_FRAMES:
-            counters['OBJECT_COUNTER'] = 0
-            print(f"🚨 CHEAT DETECTED: Object detected - Student {student_id}, Object: {lbl}")
-            threading.Thread(
-                target=handle_cheat,
-                args=(student_id, exam_id, token_header, lbl.capitalize()),
-                daemon=True
-            ).start()
-            return {"status": "cheat_detected", "reason": f"Object detected: {lbl}"}
-
-        # Log detection status periodically
-        if hasattr(process_frame, '_frame_count'):
-            process_frame._frame_count += 1
-        else:
-            process_frame._frame_count = 1
-            
-        if process_frame._frame_count % 10 == 0:  # Log every 10th frame
-            print(f"📊 Detection Status - Student {student_id}: Faces: {detection_status['faces_detected']}, "
-                  f"Counters: NO_FACE:{counters['NO_FACE_COUNTER']}, MULTI:{counters['MULTI_FACE_COUNTER']}, "
-                  f"HEAD:{counters['HEAD_TURN_COUNTER']}, GAZE:{counters['GAZE_COUNTER']}, "
-                  f"PHONE:{counters['PHONE_COUNTER']}, OBJ:{counters['OBJECT_COUNTER']}")
-
-        return {"status": "success"}
-        
-    except Exception as e:
-        print(f"Frame processing error: {e}")
-        return {"status": "error", "message": str(e)}
-
-def process_frame_practice(student_id, exam_id, frame_data):
-    """Process a single frame for practice sessions - detects cheating but doesn't upload clips"""
+            result = executor.run(student_id, process_frame, student_id, exam_id, token_header, frame_bytes,
+                                  practice, ts, seq)
+            code = 200
+        finally:
+            admission.leave(student_id)
+    else:
+        FRAMES_TOTAL.inc('practice' if practice else 'exam', outcome)
+        result, code = {"status": outcome}, 503 if outcome == BUSY else 200
+    interval_ms = admission.next_interval_ms(frame_interval_ms(exam_id))
+    result["next_interval_ms"] = interval_ms
+    # the client sends its next frame after this interval (or the response,
+    # if that took longer); the debounce gap allowance follows it
+    session = sessions.peek(student_id)
+    if session is not None:
+        session.counters['CLOCK'].pace(max(interval_ms / 1000, time.monotonic() - started),
+                                       analysed=result["status"] in ("success", "cheat_detected", "logged"))
+    return result, code
+
+def _process_frame(student_id, exam_id, token_header, frame_bytes, practice, ts=None, seq=None):
+    """Run one frame through FaceMesh, YOLO and the rules.
+
+    ``ts`` (client capture time, seconds) and ``seq`` order the student's
+    frames; a frame older than one already processed is dropped as stale.
+    In practice mode cheats are detected and logged, but no evidence is
+    buffered or uploaded.
+    """
     student_key = f"{student_id}_{exam_id}"
-    counters = get_student_counters(student_id)
-    
-    print(f"🎓 Processing practice frame for student {student_id}")
-    
+    tag = "🎓 Practice " if practice else ""
+    # client clocks aren't trusted past the server's: a capture time in the
+    # future is clamped to the receive time (FrameClock handles big rewinds)
+    now = time.time()
+    ts = now if ts is None else min(ts, now + DEBOUNCE_TOLERANCE_S)
+
+    # a stale frame must not refresh the session's idle TTL
+    session = sessions.peek(student_id)
+    if session is not None and not session.counters['CLOCK'].accept(ts, seq):
+        return {"status": "stale"}
+    fresh = sessions.get(student_id)
+    if fresh is not session:  # new (or evicted in between)
+        fresh.counters['CLOCK'].interval = frame_interval_ms(exam_id) / 1000
+        fresh.counters['CLOCK'].accept(ts, seq)
+    session = fresh
+    counters = session.counters
+
+    # Still cooling down from a reported cheat for this student
+    if not practice:
+        with CHEAT_LOCK:
+            if cheated_recently.get(student_key, 0) > time.monotonic():
+                return {"status": "processing"}
+
     try:
-        # Decode base64 frame
-        frame_bytes = base64.b64decode(frame_data.split(',')[1])
-        nparr = np.frombuffer(frame_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
+        frame = decode_frame(frame_bytes)
+
         if frame is None:
             return {"status": "error", "message": "Invalid frame data"}
-        
-        # Store frame for practice (but won't be used for clip generation)
-        counters['FRAME_BUFFER'].append(frame.copy())
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Get student-specific face mesh instance
-        student_face_mesh = face_mesh_instances[student_id]
-        
-        # Process with MediaPipe face detection with error handling
+
+        if not practice:
+            counters['FRAME_BUFFER'].append(frame_bytes)
+        with STAGE_SECONDS.time('preprocess'):
+            rgb = to_rgb(frame, FRAME_MAX_SIDE)
+
+        # Student-specific face mesh session (recreates its graph on error)
         try:
-            mp_res = student_face_mesh.process(rgb)
+            with STAGE_SECONDS.time('facemesh'):
+                faces = profiler.call('facemesh', session.face_mesh.process, rgb,
+                                      force=rule_engine.face_pending(counters))
         except Exception as mp_error:
-            print(f"🎓 Practice MediaPipe processing error for student {student_id}: {mp_error}")
-            # Create a new face mesh instance if there's an error
-            face_mesh_instances[student_id] = create_face_mesh()
-            student_face_mesh = face_mesh_instances[student_id]
-            try:
-                mp_res = student_face_mesh.process(rgb)
-            except Exception as mp_error2:
-                print(f"🎓 Practice MediaPipe processing failed again for student {student_id}: {mp_error2}")
-                return {"status": "error", "message": "MediaPipe processing failed"}
-
-        # Debug output for detection status
-        detection_status = {
-            'faces_detected': len(mp_res.multi_face_landmarks) if mp_res.multi_face_landmarks else 0,
-            'student_id': student_id,
-            'frame_size': f"{frame.shape[1]}x{frame.shape[0]}"
-        }
-
-        # ── Face checks (same as regular but just log, don't upload) ────────────────────────
-        if mp_res.multi_face_landmarks:
-            counters['NO_FACE_COUNTER'] = 0
-
-            # multiple faces detection
-            if len(mp_res.multi_face_landmarks) > 1:
-                counters['MULTI_FACE_COUNTER'] += 1
+            print(f"{tag}MediaPipe processing failed for student {student_id}: {mp_error}")
+            return {"status": "error", "message": "MediaPipe processing failed"}
+
+        session.record_frame()
+        roi, landmarks = None, faces.multi_face_landmarks
+        if DETECTOR_ROI and faces.num_faces == 1 and landmarks:
+            roi = desk_roi(landmarks[0].landmark, rgb.shape)
+        timeline = timelines.get(student_key)
+        signals = FrameSignals(
+            faces,
+            lambda: counters['DETECTION_GATE'].run(rgb, lambda: detect_objects(rgb, roi),
+                                                   force=rule_engine.detection_pending(counters)),
+            timeline, timeline.append(faces.num_faces)
+        )
+
+        t0 = time.perf_counter()
+        hit = rule_engine.evaluate(counters, signals, ts, DEBOUNCE_TOLERANCE_S)
+        STAGE_SECONDS.observe(time.perf_counter() - t0 - signals.detect_seconds, 'rules')
+        if hit:
+            detail = f", {hit.detail}" if hit.detail else ""
+            if hit.rule.action == LOG:
+                # recorded here only; clients don't act on "logged", so a
+                # log-only rule never ends the exam
+                print(f"{tag}📝 CHEAT LOGGED: {hit.reason} - Student {student_id}{detail}")
+                return {"status": "logged", "reason": hit.reason}
+            if practice:
+                print(f"🎓 PRACTICE CHEAT DETECTED: {hit.reason} - Student {student_id}{detail} (not uploaded)")
             else:
-                counters['MULTI_FACE_COUNTER'] = 0
-                
-            if counters['MULTI_FACE_COUNTER'] >= MULTI_FACE_FRAMES:
-                counters['MULTI_FACE_COUNTER'] = 0
-                print(f"🎓 PRACTICE CHEAT DETECTED: Multiple faces - Student {student_id} (not uploaded)")
-                return {"status": "cheat_detected", "reason": "Multiple faces detected (practice)"}
-
-            # single-face head-turn & gaze
-            lm = mp_res.multi_face_landmarks[0].landmark
-            angle = head_pose(lm)
-            counters['HEAD_TURN_COUNTER'] = counters['HEAD_TURN_COUNTER'] + 1 if abs(angle) > HEAD_TURN_ANGLE else 0
-            if counters['HEAD_TURN_COUNTER'] >= HEAD_TURN_FRAMES:
-                print(f"🎓 PRACTICE CHEAT DETECTED: Head turned away - Student {student_id}, Angle: {angle:.1f}° (not uploaded)")
-                counters['HEAD_TURN_COUNTER'] = 0
-                return {"status": "cheat_detected", "reason": "Head turned away (practice)"}
-
-            iris = [lm[i] for i in (468,469,470,471)]
-            left_x, right_x = min(p.x for p in iris), max(p.x for p in iris)
-            ratio = ((left_x+right_x)/2 - lm[33].x) / (lm[133].x - lm[33].x + 1e-6)
-            counters['GAZE_COUNTER'] = counters['GAZE_COUNTER']+1 if (ratio<GAZE_RATIO_MIN or ratio>GAZE_RATIO_MAX) else 0
-            if counters['GAZE_COUNTER'] >= GAZE_FRAMES:
-                print(f"🎓 PRACTICE CHEAT DETECTED: Gaze averted - Student {student_id}, Ratio: {ratio:.3f} (not uploaded)")
-                counters['GAZE_COUNTER'] = 0
-                return {"status": "cheat_detected", "reason": "Gaze averted (practice)"}
-
-        else:
-            counters['MULTI_FACE_COUNTER'] = 0
-            counters['NO_FACE_COUNTER'] += 1
-            if counters['NO_FACE_COUNTER'] >= NO_FACE_FRAMES:
-                print(f"🎓 PRACTICE CHEAT DETECTED: No face detected - Student {student_id} (not uploaded)")
-                counters['NO_FACE_COUNTER'] = 0
-                return {"status": "cheat_detected", "reason": "No face detected (practice)"}
-
-        # ── Object & phone detection ─────────────
-        results = model(rgb, size=640)
-
-        # phone detection
-        phone_seen = False
-        for *_, conf, cls in results.xyxy[0]:
-            if results.names[int(cls)] == 'cell phone' and conf >= PHONE_CONF_THRESH:
-                counters['PHONE_COUNTER'] += 1
-                phone_seen = True
-                break
-        if not phone_seen:
-            counters['PHONE_COUNTER'] = 0
-
-        if counters['PHONE_COUNTER'] >= PHONE_FRAMES:
-            counters['PHONE_COUNTER'] = 0
-            print(f"🎓 PRACTICE CHEAT DETECTED: Cell phone - Student {student_id} (not uploaded)")
-            return {"status": "cheat_detected", "reason": "Cell phone (practice)"}
-
-        # generic objects
-        found, lbl = False, None
-        for *_, _, cls in results.xyxy[0]:
-            if results.names[int(cls)] in OBJECT_CLASSES:
-                found, lbl = True, results.names[int(cls)]
-                break
+                print(f"🚨 CHEAT DETECTED: {hit.reason} - Student {student_id}{detail}")
+                report_cheat(counters['FRAME_BUFFER'], student_id, exam_id, token_header, hit.label)
+            return {"status": "cheat_detected", "reason": hit.reason + (" (practice)" if practice else "")}
 
-        counters['OBJECT_COUNTER'] = counters['OBJECT_COUNTER']+1 if found else 0
-        if counters['OBJECT_COUNTER'] >= OBJ_DET_FRAMES:
-            counters['OBJECT_COUNTER'] = 0
-            print(f"🎓 PRACTICE CHEAT DETECTED: Object detected - Student {student_id}, Object: {lbl} (not uploaded)")
-            return {"status": "cheat_detected", "reason": f"Object detected: {lbl} (practice)"}
-
-        # Log detection status periodically for practice
-        if hasattr(process_frame_practice, '_frame_count'):
-            process_frame_practice._frame_count += 1
-        else:
-            process_frame_practice._frame_count = 1
-            
-        if process_frame_practice._frame_count % 10 == 0:  # Log every 10th frame
-            print(f"🎓 Practice Detection Status - Student {student_id}: Faces: {detection_status['faces_detected']}, "
+        # Log detection status periodically
+        if session.frames % 10 == 0:  # Log every 10th frame per student
+            print(f"{tag}📊 Detection Status - Student {student_id}: Faces: {signals.faces}, "
                   f"Counters: NO_FACE:{counters['NO_FACE_COUNTER']}, MULTI:{counters['MULTI_FACE_COUNTER']}, "
                   f"HEAD:{counters['HEAD_TURN_COUNTER']}, GAZE:{counters['GAZE_COUNTER']}, "
                   f"PHONE:{counters['PHONE_COUNTER']}, OBJ:{counters['OBJECT_COUNTER']}")
 
         return {"status": "success"}
-        
+
     except Exception as e:
-        print(f"🎓 Practice frame processing error: {e}")
+        print(f"{tag}Frame processing error: {e}")
         return {"status": "error", "message": str(e)}
 
 @app.route('/process_frame_practice', methods=['POST'])
 def process_frame_practice_endpoint():
     """API endpoint to process a single frame for practice sessions - logs but doesn't upload clips"""
     try:
-        data = request.get_json()
-        raw = data.get('token')
-        exam_id = data.get('exam')
-        frame_data = data.get('frame')
+        raw, exam_id, frame_bytes = read_frame_request()
         
         print(f"🎓 Practice frame processing request: exam_id={exam_id}")
         
-        if not raw or not exam_id or not frame_data:
+        if not raw or not exam_id or frame_bytes is None:
             return jsonify({"error": "Missing required parameters"}), 400
 
         # Verify it's actually a practice session
         if exam_id != 'practice':
             return jsonify({"error": "This endpoint is only for practice sessions"}), 400
+        if not readiness.ready():
+            return models_loading()
 
         token = raw.split()[-1] if raw.startswith('Bearer ') else raw
         try:
@@ -475,9 +555,10 @@ def process_frame_practice_endpoint():
         print(f"🎓 Processing practice frame for student: {student_id}")
         
         # Process frame but don't upload any clips
-        result = process_frame_practice(student_id, exam_id, frame_data)
+        ts, seq = read_frame_clock()
+        result, code = admit_frame(student_id, exam_id, None, frame_bytes, practice=True, ts=ts, seq=seq)
         
-        return jsonify(result)
+        return jsonify(result), code, {'Retry-After': '1'} if code == 503 else {}
         
     except Exception as e:
         print(f"❌ Practice frame endpoint error: {e}")
@@ -487,13 +568,12 @@ def process_frame_practice_endpoint():
 def process_frame_endpoint():
     """API endpoint to process a single frame"""
     try:
-        data = request.get_json()
-        raw = data.get('token')
-        exam_id = data.get('exam')
-        frame_data = data.get('frame')
+        raw, exam_id, frame_bytes = read_frame_request()
         
-        if not raw or not exam_id or not frame_data:
+        if not raw or not exam_id or frame_bytes is None:
             return jsonify({"error": "Missing required parameters"}), 400
+        if not readiness.ready():
+            return models_loading()
 
         token = raw.split()[-1] if raw.startswith('Bearer ') else raw
         try:
@@ -505,9 +585,10 @@ def process_frame_endpoint():
             return jsonify({"error": "Invalid token"}), 401
 
         bearer = raw if raw.startswith('Bearer ') else f"Bearer {token}"
-        result = process_frame(student_id, exam_id, bearer, frame_data)
+        ts, seq = read_frame_clock()
+        result, code = admit_frame(student_id, exam_id, bearer, frame_bytes, ts=ts, seq=seq)
         
-        return jsonify(result)
+        return jsonify(result), code, {'Retry-After': '1'} if code == 503 else {}
         
     except Exception as e:
         print(f"Process frame endpoint error: {e}")
@@ -516,7 +597,101 @@ def process_frame_endpoint():
 @app.route('/status', methods=['GET'])
 def status():
     """Health check endpoint"""
-    return jsonify({"status": "running", "message": "AI detection server is active"})
+    ready = readiness.ready()
+    return jsonify({
+        "status": "running" if ready else "starting",
+        "message": "AI detection server is active" if ready else "Models are still loading",
+        "ready": ready,
+        "detector": dict(detector.stats(), backend=DETECTOR_BACKEND, input_size=DETECTOR_INPUT_SIZE,
+                         roi=DETECTOR_ROI),
+        "motion_gate": gate_stats.snapshot(),
+        "face_cascade": dict(cascade_stats.snapshot(), enabled=FACE_CASCADE, landmark_every=LANDMARK_EVERY),
+        "admission": admission.stats(),
+        "executor": executor.stats(),
+        "sessions": sessions.stats(),
+        "timelines": timelines.stats(),
+        "uploads": uploader.stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/profile', methods=['GET'])
+def profile():
+    """Accumulated cProfile samples for ``?stage=yolo_batch|facemesh``"""
+    stage = request.args.get('stage', 'yolo_batch')
+    report = profiler.report(stage, limit=request.args.get('limit', 30, type=int),
+                             sort=request.args.get('sort', 'cumulative'))
+    if report is None:
+        return jsonify({"error": f"No samples for {stage!r} (is PROFILE_SAMPLE_RATE set?)"}), 404
+    return Response(report, mimetype='text/plain')
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 200 once the detector and face mesh are warmed up"""
+    snapshot = readiness.snapshot()
+    return jsonify(snapshot), 200 if snapshot['ready'] else 503
+
+@app.route('/timeline', methods=['GET'])
+def timeline_export():
+    """Stream a (downsampled) signal timeline for one student/exam.
+
+    Query: ``exam``, ``student`` (teachers only; students get their own),
+    ``max_points`` (default 2000) and ``format`` = ``ndjson`` (default) or
+    ``npz`` for the raw column arrays.
+    """
+    raw = request.headers.get('Authorization', '')
+    token = raw.split()[-1] if raw.startswith('Bearer ') else raw
+    try:
+        payload = jwt.decode(token, SECRET, algorithms=['HS256'])
+    except jwt.ExpiredSignatureError:
+        return jsonify({"error": "Token expired"}), 401
+    except Exception:
+        return jsonify({"error": "Invalid token"}), 401
+
+    exam_id = request.args.get('exam')
+    if not exam_id:
+        return jsonify({"error": "Missing exam"}), 400
+    if payload.get('role') == 'teacher':
+        student_id = request.args.get('student')
+        if not student_id:
+            return jsonify({"error": "Missing student"}), 400
+    else:
+        student_id = payload['userId']
+
+    timeline = timelines.peek(f"{student_id}_{exam_id}")
+    if timeline is None:
+        return jsonify({"error": "No timeline for this student/exam"}), 404
+
+    max_points = request.args.get('max_points', 2000, type=int)
+    cols, step = timeline.export(max_points)
+
+    if request.args.get('format') == 'npz':
+        buf = io.BytesIO()
+        np.savez_compressed(buf, t0=np.float64(timeline.t0), step=step,
+                            watched=np.array(timeline.watched), **cols)
+        return Response(buf.getvalue(), mimetype='application/octet-stream',
+                        headers={'Content-Disposition': f'attachment; filename=timeline_{student_id}_{exam_id}.npz'})
+
+    def rows():
+        yield json.dumps({
+            'student': student_id, 'exam': exam_id, 't0': timeline.t0,
+            'step': step, 'count': len(cols['t']), 'watched': timeline.watched
+        }) + '\n'
+        nan_to_none = lambda v: None if np.isnan(v) else round(float(v), 3)
+        for i in range(len(cols['t'])):
+            yield json.dumps({
+                't': round(float(cols['t'][i]), 3),
+                'faces': int(cols['faces'][i]),
+                'angle': nan_to_none(cols['angle'][i]),
+                'gaze': nan_to_none(cols['gaze'][i]),
+                'classes': [name for bit, name in enumerate(timeline.watched) if cols['classes'][i] >> bit & 1],
+                'phone_conf': round(float(cols['phone_conf'][i]), 3)
+            }) + '\n'
+
+    return Response(rows(), mimetype='application/x-ndjson')
 
 @app.route('/cleanup_student', methods=['POST'])
 def cleanup_student():
@@ -537,19 +712,7 @@ def cleanup_student():
         except Exception:
             return jsonify({"error": "Invalid token"}), 401
 
-        # Clean up student data
-        if student_id in student_counters:
-            del student_counters[student_id]
-        
-        # Clean up face mesh instance
-        if student_id in face_mesh_instances:
-            del face_mesh_instances[student_id]
-        
-        # Clean up cheat flags for this student
-        keys_to_remove = [key for key in cheated_recently.keys() if key.startswith(f"{student_id}_")]
-        for key in keys_to_remove:
-            del cheated_recently[key]
-            
+        executor.run(student_id, release_student, student_id)  # after the student's queued frames
         print(f"✅ Cleaned up data for student {student_id}")
         return jsonify({"status": "success"})
         
@@ -557,5 +720,77 @@ def cleanup_student():
         print(f"Cleanup error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
+@sock.route('/stream')
+def stream(ws):
+    """Streaming proctoring session over a WebSocket.
+
+    The first message is JSON ``{"token": "Bearer ...", "exam": "..."}``;
+    the token is verified once for the whole session.  Every following
+    binary message is one JPEG frame and is answered with the same JSON
+    verdict the HTTP endpoints return, including ``next_interval_ms``; a
+    text message ``{"ts": <epoch ms>, "seq": n}`` stamps the next frame.
+    The student's counters and face mesh are released when the socket
+    closes.
+    """
+    student_id = None
+    try:
+        try:
+            hello = json.loads(ws.receive(timeout=10) or '{}')
+        except ValueError:
+            hello = {}
+        raw, exam_id = hello.get('token'), hello.get('exam')
+        if not raw or not exam_id:
+            ws.send(json.dumps({"error": "Missing required parameters"}))
+            return
+
+        token = raw.split()[-1] if raw.startswith('Bearer ') else raw
+        try:
+            payload = jwt.decode(token, SECRET, algorithms=['HS256'])
+            student_id = payload['userId']
+        except jwt.ExpiredSignatureError:
+            ws.send(json.dumps({"error": "Token expired"}))
+            return
+        except Exception:
+            ws.send(json.dumps({"error": "Invalid token"}))
+            return
+
+        bearer   = f"Bearer {token}"
+        practice = exam_id == 'practice'
+        ts = seq = None
+        ws.send(json.dumps({"status": "ready"}))
+        print(f"🔌 Stream opened - Student {student_id}, exam {exam_id}")
+
+        while True:
+            msg = ws.receive()
+            if msg is None:
+                break
+            if not isinstance(msg, (bytes, bytearray)):
+                # text messages are keep-alives, or {"ts": ms, "seq": n} for the next frame
+                try:
+                    meta = json.loads(msg)
+                    ts = float(meta['ts']) / 1000
+                    seq = int(meta['seq']) if meta.get('seq') is not None else None
+                except (ValueError, TypeError, KeyError):
+                    pass
+                continue
+            if not readiness.ready():
+                result = {"error": "Models are still loading", "retry_after_s": 2}
+            else:
+                result, _ = admit_frame(student_id, exam_id, bearer, msg, practice=practice, ts=ts, seq=seq)
+            ts = seq = None
+            ws.send(json.dumps(result))
+
+    except ConnectionClosed:
+        pass
+    finally:
+        if student_id is not None:
+            executor.run(student_id, release_student, student_id)
+            print(f"🔌 Stream closed - cleaned up student {student_id}")
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, threaded=True)
+    if WORKERS > 1:
+        from workers import serve_prefork
+        serve_prefork(app, host='0.0.0.0', port=5001, workers=WORKERS, base_port=WORKER_BASE_PORT,
+                      threads_per_worker=DETECTOR_THREADS, on_worker_start=start_models)
+    else:
+        app.run(host='0.0.0.0', port=5001, threaded=True)
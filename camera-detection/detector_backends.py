@@ -0,0 +1,270 @@
+"""Pluggable CPU inference backends for the object detector.
+
+Every backend is called exactly like the YOLOv5 AutoShape model,
+``backend(imgs, size=...)`` with one RGB ndarray or a list of them, and
+returns an object with ``.xyxy`` (one ``(n, 6)`` array per image, rows of
+``x1, y1, x2, y2, conf, cls`` in original pixel coordinates) and
+``.names``, so the phone/object rules and the batcher don't care which
+backend is running.
+
+    torch      eager PyTorch through torch.hub (the original path)
+    onnx       ONNX Runtime on an exported graph (export_detector.py),
+               FP32 or the INT8 QDQ variant
+    openvino   OpenVINO on the same ONNX file or an IR .xml
+
+``backend.prepare(img, roi)`` does the per-frame resizing ahead of time:
+it crops to an optional ``(x0, y0, x1, y1)`` region and letterboxes the
+result, returning a ``Prepared`` frame that can be passed in place of the
+ndarray.  The server prepares each frame in its own request thread so the
+batcher thread only stacks and runs the batch.  Boxes always come back in
+the coordinates of the uncropped image.
+
+Backends are cheap to construct; the weights are read on ``load()`` (or
+the first call), so the server can bind before the models are in memory.
+Eager torch can be loaded before a prefork (``fork_safe``) and shared
+copy-on-write; ONNX Runtime and OpenVINO sessions must be created after
+the fork so every worker owns its thread pool.
+
+The torch backend loads from a vendored YOLOv5 checkout and weights file
+when ``repo``/``weights`` are given (see vendor_models.py), so air-gapped
+pods never touch the network; otherwise it falls back to torch.hub.
+"""
+import ast, collections, os, threading
+import numpy as np, cv2
+
+# COCO class names, used when an exported graph carries no 'names' metadata
+COCO_NAMES = [
+    'person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus', 'train', 'truck', 'boat',
+    'traffic light', 'fire hydrant', 'stop sign', 'parking meter', 'bench', 'bird', 'cat',
+    'dog', 'horse', 'sheep', 'cow', 'elephant', 'bear', 'zebra', 'giraffe', 'backpack',
+    'umbrella', 'handbag', 'tie', 'suitcase', 'frisbee', 'skis', 'snowboard', 'sports ball',
+    'kite', 'baseball bat', 'baseball glove', 'skateboard', 'surfboard', 'tennis racket',
+    'bottle', 'wine glass', 'cup', 'fork', 'knife', 'spoon', 'bowl', 'banana', 'apple',
+    'sandwich', 'orange', 'broccoli', 'carrot', 'hot dog', 'pizza', 'donut', 'cake', 'chair',
+    'couch', 'potted plant', 'bed', 'dining table', 'toilet', 'tv', 'laptop', 'mouse',
+    'remote', 'keyboard', 'cell phone', 'microwave', 'oven', 'toaster', 'sink',
+    'refrigerator', 'book', 'clock', 'vase', 'scissors', 'teddy bear', 'hair drier',
+    'toothbrush'
+]
+MAX_DET = 300
+
+
+class Detections:
+    """Minimal stand-in for YOLOv5's Detections (``xyxy`` and ``names``)."""
+    __slots__ = ('xyxy', 'names')
+
+    def __init__(self, xyxy, names):
+        self.xyxy  = xyxy
+        self.names = names
+
+
+class Prepared(collections.namedtuple('Prepared', 'img ratio pad shape offset')):
+    """A frame already cropped/letterboxed for one backend (see ``prepare``)."""
+    __slots__ = ()
+
+
+def _shift(xyxy, offset):
+    """Move boxes from crop to full-image coordinates (ndarray or tensor)."""
+    if offset != (0, 0):
+        xyxy[:, [0, 2]] += offset[0]
+        xyxy[:, [1, 3]] += offset[1]
+    return xyxy
+
+
+def letterbox(img, size, color=(114, 114, 114)):
+    """Resize keeping aspect ratio and pad to ``size`` x ``size`` (YOLOv5 style).
+
+    Returns ``(padded, ratio, (pad_x, pad_y))``.
+    """
+    h, w  = img.shape[:2]
+    ratio = min(size / h, size / w)
+    nw, nh = round(w * ratio), round(h * ratio)
+    if (nw, nh) != (w, h):
+        img = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (size - nw) / 2, (size - nh) / 2
+    top, bottom = round(pad_y - 0.1), round(pad_y + 0.1)
+    left, right = round(pad_x - 0.1), round(pad_x + 0.1)
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return img, ratio, (left, top)
+
+
+def postprocess(pred, conf_thres, iou_thres, ratio, pad, shape):
+    """Raw YOLOv5 head output ``(N, 5 + classes)`` → ``(n, 6)`` xyxy/conf/cls rows."""
+    pred = pred[pred[:, 4] > conf_thres]
+    if not len(pred):
+        return np.zeros((0, 6), np.float32)
+    scores = pred[:, 5:] * pred[:, 4:5]
+    cls    = scores.argmax(1)
+    conf   = scores[np.arange(len(scores)), cls]
+    keep   = conf > conf_thres
+    pred, cls, conf = pred[keep], cls[keep], conf[keep]
+    if not len(pred):
+        return np.zeros((0, 6), np.float32)
+
+    xy, wh = pred[:, :2], pred[:, 2:4]
+    boxes  = np.concatenate([xy - wh / 2, xy + wh / 2], 1)
+    # class-aware NMS: shift each class into its own coordinate range
+    offset = (cls * 4096)[:, None].astype(np.float32)
+    nms_in = np.concatenate([boxes[:, :2] + offset, wh], 1)
+    idx    = cv2.dnn.NMSBoxes(nms_in.tolist(), conf.tolist(), conf_thres, iou_thres, top_k=MAX_DET)
+    idx    = np.asarray(idx, dtype=int).reshape(-1)
+    boxes, conf, cls = boxes[idx], conf[idx], cls[idx]
+
+    boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad[0]) / ratio).clip(0, shape[1])
+    boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad[1]) / ratio).clip(0, shape[0])
+    return np.concatenate([boxes, conf[:, None], cls[:, None]], 1).astype(np.float32)
+
+
+class LazyBackend:
+    """Load-on-demand plumbing shared by all backends."""
+    fork_safe = False
+
+    def __init__(self, size=640, conf=0.5, iou=0.45, threads=0):
+        self.size    = size
+        self.conf    = conf
+        self.iou     = iou
+        self.threads = threads
+        self.names   = {i: n for i, n in enumerate(COCO_NAMES)}
+        self.loaded  = False
+        self._lock   = threading.Lock()
+
+    def load(self):
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    self._load()
+                    self.loaded = True
+
+    def warmup(self):
+        self(np.zeros((self.size, self.size, 3), dtype=np.uint8))
+
+    def prepare(self, img, roi=None):
+        """Crop ``img`` to ``roi`` (a view, no copy) and resize it for this backend."""
+        offset = (0, 0)
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            img, offset = img[y0:y1, x0:x1], (x0, y0)
+        return self._prepare(img, offset)
+
+    def _prepared(self, imgs):
+        single = isinstance(imgs, (np.ndarray, Prepared))
+        return [p if isinstance(p, Prepared) else self.prepare(p) for p in ([imgs] if single else imgs)]
+
+
+class ExportedBackend(LazyBackend):
+    """Shared pre/post-processing for exported YOLOv5 graphs."""
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+
+    def _prepare(self, img, offset):
+        padded, ratio, pad = letterbox(img, self.size)
+        return Prepared(padded, ratio, pad, img.shape, offset)
+
+    def __call__(self, imgs, size=None):
+        self.load()
+        # graphs are exported at a fixed input size; ``size`` is ignored
+        prep   = self._prepared(imgs)
+        batch  = np.stack([p.img for p in prep]).transpose(0, 3, 1, 2)
+        batch  = np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+        out    = self._forward(batch)
+        xyxy   = [_shift(postprocess(out[i], self.conf, self.iou, p.ratio, p.pad, p.shape), p.offset)
+                  for i, p in enumerate(prep)]
+        return Detections(xyxy, self.names)
+
+
+class OnnxBackend(ExportedBackend):
+    def _load(self):
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opts.intra_op_num_threads = self.threads
+        self.session = ort.InferenceSession(self.path, opts, providers=['CPUExecutionProvider'])
+        self.input   = self.session.get_inputs()[0].name
+        names = self.session.get_modelmeta().custom_metadata_map.get('names')
+        if names:
+            self.names = ast.literal_eval(names)
+
+    def _forward(self, batch):
+        return self.session.run(None, {self.input: batch})[0]
+
+
+class OpenVinoBackend(ExportedBackend):
+    def _load(self):
+        import openvino as ov
+        core   = ov.Core()
+        config = {'INFERENCE_NUM_THREADS': self.threads} if self.threads else {}
+        self.compiled = core.compile_model(core.read_model(self.path), 'CPU', config)
+        self.output   = self.compiled.output(0)
+
+    def _forward(self, batch):
+        return self.compiled(batch)[self.output]
+
+
+class TorchBackend(LazyBackend):
+    """Eager PyTorch YOLOv5.
+
+    Frames are letterboxed in ``prepare`` like for the exported graphs and
+    the batch goes straight to the network inside AutoShape, with the same
+    numpy post-processing (confidence filter + NMS), so AutoShape's own
+    resize/pad never runs in the batcher thread.
+    """
+    fork_safe = True
+
+    def __init__(self, repo=None, weights=None, **kwargs):
+        super().__init__(**kwargs)
+        self.repo    = repo
+        self.weights = weights
+
+    def _load(self):
+        import torch
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        if self.repo:
+            weights = self.weights or os.path.join(self.repo, 'yolov5s.pt')
+            self.model = torch.hub.load(self.repo, 'custom', path=weights, source='local')
+        elif self.weights:
+            self.model = torch.hub.load('ultralytics/yolov5', 'custom', path=self.weights)
+        else:
+            self.model = torch.hub.load('ultralytics/yolov5', 'yolov5s', pretrained=True)
+        self.model.conf, self.model.iou = self.conf, self.iou
+        self.model.eval()
+        self.names = self.model.names
+        self._torch = torch
+
+    def _prepare(self, img, offset):
+        padded, ratio, pad = letterbox(img, self.size)
+        return Prepared(padded, ratio, pad, img.shape, offset)
+
+    def __call__(self, imgs, size=None):
+        self.load()
+        # frames are letterboxed to self.size by prepare(); ``size`` is ignored
+        torch = self._torch
+        prep  = self._prepared(imgs)
+        batch = np.ascontiguousarray(np.stack([p.img for p in prep]).transpose(0, 3, 1, 2))
+        with torch.inference_mode():
+            out = self.model.model(torch.from_numpy(batch).float() / 255.0)  # skips AutoShape
+        out = out[0] if isinstance(out, (list, tuple)) else out
+        out = out.float().cpu().numpy()
+        xyxy = [_shift(postprocess(out[i], self.conf, self.iou, p.ratio, p.pad, p.shape), p.offset)
+                for i, p in enumerate(prep)]
+        return Detections(xyxy, self.names)
+
+
+BACKENDS = {'torch': TorchBackend, 'onnx': OnnxBackend, 'openvino': OpenVinoBackend}
+
+
+def load_detector(backend='torch', model_path=None, size=640, conf=0.5, iou=0.45, threads=0, repo=None):
+    """Build (but don't load) the configured detector backend.
+
+    ``model_path`` is the exported graph for onnx/openvino, or an optional
+    local ``.pt`` for torch; ``repo`` a local YOLOv5 checkout for torch.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown DETECTOR_BACKEND {backend!r} (expected one of {sorted(BACKENDS)})")
+    if backend == 'torch':
+        return TorchBackend(repo=repo, weights=model_path, size=size, conf=conf, iou=iou, threads=threads)
+    if not model_path:
+        raise ValueError(f"DETECTOR_MODEL must point to an exported model for backend {backend!r}")
+    return BACKENDS[backend](model_path, size=size, conf=conf, iou=iou, threads=threads)
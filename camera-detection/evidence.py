@@ -0,0 +1,199 @@
+"""Per-student evidence ring buffer of encoded JPEG frames.
+
+Every frame already arrives as a 30-60 KB JPEG, while a decoded 720p BGR
+frame is ~2.7 MB.  The buffer therefore keeps the original bytes together
+with their arrival time, bounded both by frame count and by total bytes,
+and frames are only decoded when video is actually encoded.
+
+With an encoder pool attached, the buffer also encodes the stream as it
+arrives: every ``segment_seconds`` the frames received since the last cut
+are encoded in the background into a short H.264 MP4 segment, at the
+frame rate they really arrived at.  An incident clip is then just the
+recent segments plus the few not-yet-encoded tail frames, joined with
+ffmpeg's concat demuxer and remuxed to MP4 without re-encoding, so a room
+full of simultaneous incidents no longer means a burst of full encodes.
+
+Each buffer keeps at most ``max_encoding`` segments queued or running on
+the shared pool.  When the pool falls behind, frames stay in the pending
+tail (bounded like the ring) and go into the next segment once the
+previous one finished, so the backlog never outgrows one segment per
+student.
+"""
+import collections, os, subprocess, tempfile, threading, time
+import numpy as np, cv2, imageio_ffmpeg
+
+Segment = collections.namedtuple('Segment', 'start end frames data')
+# Everything a clip is built from, taken in one step under the buffer lock
+ClipParts = collections.namedtuple('ClipParts', 'frames segments encoding tail')
+
+
+class EvidenceBuffer:
+    def __init__(self, max_frames=150, max_bytes=12 * 1024 * 1024,
+                 encoder_pool=None, segment_seconds=5.0, max_encoding=1):
+        self.max_frames      = max_frames
+        self.max_bytes       = max_bytes
+        self.nbytes          = 0
+        self.encoder_pool    = encoder_pool
+        self.segment_seconds = segment_seconds
+        self.max_encoding    = max(1, max_encoding)
+        self._frames    = collections.deque()  # (arrival time, jpeg bytes)
+        self._pending   = []                   # frames not yet handed to a segment
+        self._encoding  = []                   # (future, frames) of background segments
+        self._segments  = collections.deque()  # finished Segments, oldest first
+        self._lock      = threading.Lock()
+
+    def append(self, jpeg, ts=None):
+        jpeg = bytes(jpeg)  # websocket messages may be bytearrays
+        ts   = time.time() if ts is None else ts
+        with self._lock:
+            self._frames.append((ts, jpeg))
+            self.nbytes += len(jpeg)
+            while self._frames and (len(self._frames) > self.max_frames or self.nbytes > self.max_bytes):
+                self.nbytes -= len(self._frames.popleft()[1])
+
+            if self.encoder_pool is None:
+                return
+            self._harvest()
+            if (self._pending and ts - self._pending[0][0] >= self.segment_seconds
+                    and len(self._encoding) < self.max_encoding):
+                batch, self._pending = self._pending, []
+                self._encoding.append((self.encoder_pool.submit(encode_segment, batch), batch))
+            self._pending.append((ts, jpeg))
+            if len(self._pending) > self.max_frames:  # pool behind: older frames left the ring anyway
+                del self._pending[:len(self._pending) - self.max_frames]
+
+    def snapshot(self):
+        """List of (arrival time, jpeg bytes), oldest first."""
+        with self._lock:
+            return list(self._frames)
+
+    def clip_parts(self):
+        """Snapshot of the ring, its segments and the tail, for ``build_clip``."""
+        with self._lock:
+            self._harvest()
+            return ClipParts(list(self._frames), list(self._segments), list(self._encoding), list(self._pending))
+
+    def build_clip(self, parts=None):
+        """MP4 bytes of the buffered evidence (None if there is none).
+
+        ``parts`` is a ``clip_parts()`` snapshot taken earlier, e.g. when
+        the incident was detected; by default one is taken now.
+        """
+        frames, segments, encoding, tail = parts or self.clip_parts()
+        if not frames:
+            return None
+
+        if self.encoder_pool is not None:
+            try:
+                oldest   = frames[0][0]
+                segments = [s for s in segments if s.end >= oldest]
+                for fut, batch in encoding:
+                    segments.append(self._finish(fut, batch))
+                if tail:
+                    segments.append(encode_segment(tail))
+                segments = [s for s in segments if s is not None]
+                if segments:
+                    return concat_segments(segments)
+            except Exception as e:
+                print(f"⚠️ Segment clip failed, re-encoding buffer: {e}")
+
+        return concat_segments([encode_segment(frames)])
+
+    def _finish(self, fut, batch):
+        """A background segment's result; one still queued is encoded here
+        instead of waiting behind other students' segments."""
+        if not fut.cancel():
+            return fut.result()
+        seg = None
+        try:
+            seg = encode_segment(batch)
+            return seg
+        finally:
+            with self._lock:
+                kept = [(f, b) for f, b in self._encoding if f is not fut]
+                if len(kept) < len(self._encoding):  # not cleared meanwhile
+                    self._encoding = kept
+                    if seg is not None:
+                        self._segments.append(seg)
+
+    def _harvest(self):
+        """Move finished background segments into the ring (lock held)."""
+        still_running = []
+        for fut, batch in self._encoding:
+            if not fut.done() or fut.cancelled():  # a cancelled one is being encoded by _finish
+                still_running.append((fut, batch))
+            elif fut.exception() is None and fut.result() is not None:
+                self._segments.append(fut.result())
+            elif fut.exception() is not None:
+                print(f"⚠️ Segment encode error: {fut.exception()}")
+        self._encoding = still_running
+        self._segments = collections.deque(sorted(self._segments, key=lambda s: s.start))
+        kept = sum(s.frames for s in self._segments)
+        while self._segments and kept - self._segments[0].frames >= self.max_frames:
+            kept -= self._segments.popleft().frames
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._pending  = []
+            self._encoding = []
+            self._segments.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._frames)
+
+
+def decode_jpeg(jpeg):
+    return cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+
+
+def encode_segment(frames):
+    """Encode [(arrival time, jpeg)] to an MP4 Segment at their real frame rate."""
+    decoded = [(ts, img) for ts, img in ((ts, decode_jpeg(j)) for ts, j in frames) if img is not None]
+    if not decoded:
+        return None
+    h, w = decoded[0][1].shape[:2]
+    span = decoded[-1][0] - decoded[0][0]
+    fps  = (len(decoded) - 1) / span if len(decoded) > 1 and span > 0 else 1.0
+
+    fd, path = tempfile.mkstemp(suffix='.mp4')
+    os.close(fd)
+    try:
+        writer = imageio_ffmpeg.write_frames(
+            path, (w, h), pix_fmt_in='bgr24', fps=round(fps, 3), codec='libx264',
+            macro_block_size=2, output_params=['-preset', 'veryfast']
+        )
+        writer.send(None)
+        for _, img in decoded:
+            if img.shape[:2] != (h, w):
+                img = cv2.resize(img, (w, h))
+            writer.send(np.ascontiguousarray(img))
+        writer.close()
+        with open(path, 'rb') as f:
+            data = f.read()
+    finally:
+        os.remove(path)
+    return Segment(decoded[0][0], decoded[-1][0], len(decoded), data)
+
+
+def concat_segments(segments):
+    """Join MP4 segments into one clip without re-encoding."""
+    with tempfile.TemporaryDirectory() as tmp:
+        listing = os.path.join(tmp, 'segments.txt')
+        with open(listing, 'w') as f:
+            for i, seg in enumerate(segments):
+                name = os.path.join(tmp, f'{i:04d}.mp4')
+                with open(name, 'wb') as s:
+                    s.write(seg.data)
+                f.write(f"file '{name}'\n")
+        out = os.path.join(tmp, 'clip.mp4')
+        subprocess.run(
+            [imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-loglevel', 'error',
+             '-f', 'concat', '-safe', '0', '-i', listing,
+             '-c', 'copy', '-movflags', '+faststart', out],
+            check=True, capture_output=True
+        )
+        with open(out, 'rb') as f:
+            return f.read()
@@ -0,0 +1,110 @@
+"""Per-student actors on a bounded worker pool.
+
+Flask's ``threaded=True`` gives every request its own thread, so two frames
+from one student could run ``process_frame`` at the same time and race on
+the student's debounce counters, evidence buffer and FaceMesh graph, while
+frames from different students had no bound on parallelism at all.
+
+``StudentExecutor`` gives every student a FIFO queue (an actor) and runs
+queued work on a ``ThreadPoolExecutor`` of ``workers`` threads: tasks of
+one student run one at a time, in submission order; different students
+run in parallel up to the pool size.  A worker runs one task per turn and
+then re-queues the student behind the others, so a student with a backlog
+cannot starve the rest.
+
+``cpu_slots`` caps how many tasks compute at once, independently of the
+thread count: a task that blocks on something else (its YOLO batch) inside
+``waiting()`` hands its slot to another student meanwhile.  The pool can
+then have more threads than slots - enough to fill a YOLO batch - without
+running more face analysis at once than the CPU budget allows.
+"""
+import collections, contextlib, os, threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class StudentExecutor:
+    def __init__(self, workers, cpu_slots=None):
+        self.workers   = max(1, int(workers))
+        self.cpu_slots = max(1, int(cpu_slots)) if cpu_slots else self.workers
+        self._start()
+        # prefork workers (workers.py) need their own pool threads
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self._lock   = threading.Lock()
+        self._queues = {}  # student -> deque of pending tasks, present while scheduled
+        self._pool   = ThreadPoolExecutor(self.workers, thread_name_prefix='student')
+        self._cpu    = threading.Semaphore(self.cpu_slots)
+        self._local  = threading.local()
+        self.tasks   = 0
+        self.waiting_tasks = 0
+
+    def submit(self, student_id, fn, *args, **kwargs):
+        """Queue ``fn(*args, **kwargs)`` behind the student's earlier tasks."""
+        fut = Future()
+        with self._lock:
+            queue = self._queues.get(student_id)
+            idle  = queue is None
+            if idle:
+                queue = self._queues[student_id] = collections.deque()
+            queue.append((fn, args, kwargs, fut))
+        if idle:
+            self._pool.submit(self._step, student_id)
+        return fut
+
+    def run(self, student_id, fn, *args, **kwargs):
+        """``submit`` and wait for the result (re-raises the task's exception)."""
+        return self.submit(student_id, fn, *args, **kwargs).result()
+
+    def _step(self, student_id):
+        # the running task stays at the head of the queue, so a concurrent
+        # submit sees the student as scheduled and only appends
+        with self._lock:
+            fn, args, kwargs, fut = self._queues[student_id][0]
+        if fut.set_running_or_notify_cancel():
+            self._cpu.acquire()
+            self._local.slot = True
+            try:
+                fut.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                fut.set_exception(e)
+            finally:
+                self._local.slot = False
+                self._cpu.release()
+        with self._lock:
+            queue = self._queues[student_id]
+            queue.popleft()
+            self.tasks += 1
+            if not queue:
+                del self._queues[student_id]
+                return
+        self._pool.submit(self._step, student_id)
+
+    @contextlib.contextmanager
+    def waiting(self):
+        """Give the calling task's CPU slot back while it blocks."""
+        held = getattr(self._local, 'slot', False)
+        if held:
+            self._local.slot = False
+            self._cpu.release()
+            with self._lock:
+                self.waiting_tasks += 1
+        try:
+            yield
+        finally:
+            if held:
+                with self._lock:
+                    self.waiting_tasks -= 1
+                self._cpu.acquire()
+                self._local.slot = True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'cpu_slots': self.cpu_slots,
+                'waiting': self.waiting_tasks,
+                'students': len(self._queues),
+                'pending': sum(len(q) for q in self._queues.values()),
+                'tasks': self.tasks,
+            }
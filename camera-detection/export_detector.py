@@ -0,0 +1,102 @@
+"""Export YOLOv5s to ONNX for the onnx / openvino detector backends.
+
+Writes ``yolov5s-<size>.onnx`` (FP32, dynamic batch, fixed square input)
+and, with ``--int8``, ``yolov5s-<size>-int8.onnx`` - a static QDQ
+quantization calibrated on real webcam frames.  Only the convolutions are
+quantized; the box-decoding tail stays in float so coordinates don't drift.
+Both files run on ONNX Runtime and OpenVINO (which executes the QDQ graph
+in INT8 on CPUs with VNNI/AMX).
+
+    cd camera-detection
+    python export_detector.py --size 320 416 640 --int8 --calib /data/frames/calib
+    DETECTOR_BACKEND=onnx DETECTOR_INPUT_SIZE=416 DETECTOR_MODEL=models/yolov5s-416-int8.onnx python camera_server.py
+"""
+import argparse, glob, os
+import numpy as np, cv2
+from detector_backends import letterbox
+
+
+def load_torch_model():
+    import torch
+    hub = torch.hub.load('ultralytics/yolov5', 'yolov5s', pretrained=True, autoshape=False)
+    model = hub.model.float().eval()  # DetectMultiBackend → DetectionModel
+    names = hub.names if isinstance(hub.names, dict) else dict(enumerate(hub.names))
+    for m in model.modules():
+        if type(m).__name__ == 'Detect':
+            m.inplace = False
+            m.export  = True   # return only the decoded (N, 85) predictions
+    return model, names
+
+
+def export_onnx(model, names, size, path):
+    import torch, onnx
+    dummy = torch.zeros(1, 3, size, size)
+    torch.onnx.export(model, dummy, path, opset_version=13, do_constant_folding=True,
+                      input_names=['images'], output_names=['output0'],
+                      dynamic_axes={'images': {0: 'batch'}, 'output0': {0: 'batch'}})
+    graph = onnx.load(path)
+    for key, value in (('names', str(names)), ('imgsz', str(size))):
+        meta = graph.metadata_props.add()
+        meta.key, meta.value = key, value
+    onnx.save(graph, path)
+
+
+def calibration_frames(calib_dir, size, limit):
+    paths = sorted(glob.glob(os.path.join(calib_dir, '*.jp*g')))[:limit]
+    if not paths:
+        raise SystemExit(f"no JPEG frames found in {calib_dir}")
+    for p in paths:
+        rgb = cv2.cvtColor(cv2.imread(p), cv2.COLOR_BGR2RGB)
+        img = letterbox(rgb, size)[0].transpose(2, 0, 1)[None]
+        yield np.ascontiguousarray(img, dtype=np.float32) / 255.0
+
+
+def quantize_int8(src, dst, calib_dir, size, limit):
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    class Frames(CalibrationDataReader):
+        def __init__(self):
+            self.it = ({'images': x} for x in calibration_frames(calib_dir, size, limit))
+
+        def get_next(self):
+            return next(self.it, None)
+
+    prepped = dst + '.prep.onnx'
+    quant_pre_process(src, prepped)
+    try:
+        quantize_static(prepped, dst, Frames(), quant_format=QuantFormat.QDQ,
+                        op_types_to_quantize=['Conv'], per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    finally:
+        os.remove(prepped)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--size', type=int, nargs='+', default=[640], help='input sizes (320 / 416 / 640)')
+    ap.add_argument('--out', default='models')
+    ap.add_argument('--int8', action='store_true', help='also write an INT8 QDQ variant')
+    ap.add_argument('--calib', help='directory of JPEG frames for INT8 calibration')
+    ap.add_argument('--calib-frames', type=int, default=200)
+    args = ap.parse_args()
+    if args.int8 and not args.calib:
+        ap.error('--int8 needs --calib (a few hundred representative webcam frames)')
+
+    os.makedirs(args.out, exist_ok=True)
+    model, names = load_torch_model()
+    for size in args.size:
+        if size % 32:
+            ap.error(f'size {size} is not a multiple of 32')
+        path = os.path.join(args.out, f'yolov5s-{size}.onnx')
+        export_onnx(model, names, size, path)
+        print(f"✅ {path}")
+        if args.int8:
+            qpath = os.path.join(args.out, f'yolov5s-{size}-int8.onnx')
+            quantize_int8(path, qpath, args.calib, size, args.calib_frames)
+            print(f"✅ {qpath}")
+
+
+if __name__ == '__main__':
+    main()
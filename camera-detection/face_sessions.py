@@ -0,0 +1,176 @@
+"""Per-student MediaPipe FaceMesh graphs in tracking (video) mode.
+
+``static_image_mode=True`` runs full face detection plus landmark
+regression on every frame.  In video mode FaceMesh re-uses the previous
+frame's landmarks as the region of interest and only falls back to
+detection when tracking is lost, which is much cheaper - but a graph then
+requires strictly increasing timestamps, which shared or concurrently-used
+graphs violated.  A ``FaceMeshSession`` owns one graph per student, feeds
+it one frame at a time with a monotonic per-session clock, and rebuilds
+the graph transparently if MediaPipe raises.
+
+With ``cascade=True`` the session first runs MediaPipe face detection
+(BlazeFace, a fraction of the cost), which alone settles the no-face and
+multi-face rules.  The refined mesh with iris landmarks only runs when
+exactly one face is present: on every ``landmark_every``-th such frame, and
+on every frame while a head-turn/gaze streak is building (``force``).  In
+between, the last landmarks are reused, the way the motion gate reuses
+YOLO detections, so the debounce counters keep counting in frames.
+"""
+import math, threading, time
+import numpy as np
+
+
+def create_face_mesh(static_image_mode=False, max_num_faces=2):
+    import mediapipe as mp  # heavy; imported on first use, not at server start
+    return mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=static_image_mode,
+        max_num_faces=max_num_faces,
+        refine_landmarks=True,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+
+
+def create_face_detector():
+    import mediapipe as mp
+    return mp.solutions.face_detection.FaceDetection(model_selection=0, min_detection_confidence=0.5)
+
+
+class FaceResult:
+    """What the rules need from one frame: the face count and, when the
+    mesh ran (or was reused), ``multi_face_landmarks`` like FaceMesh's."""
+    __slots__ = ('num_faces', 'multi_face_landmarks')
+
+    def __init__(self, num_faces, multi_face_landmarks):
+        self.num_faces            = num_faces
+        self.multi_face_landmarks = multi_face_landmarks
+
+
+class CascadeStats:
+    """Process-wide count of frames that needed the refined mesh."""
+
+    def __init__(self):
+        self._lock  = threading.Lock()
+        self.frames = 0
+        self.mesh   = 0
+        self.reused = 0
+
+    def record(self, mesh, reused):
+        with self._lock:
+            self.frames += 1
+            self.mesh   += mesh
+            self.reused += reused
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'frames': self.frames,
+                'mesh_runs': self.mesh,
+                'landmarks_reused': self.reused,
+                'mesh_rate': round(self.mesh / self.frames, 3) if self.frames else 0.0,
+            }
+
+
+cascade_stats = CascadeStats()
+
+
+class FaceMeshSession:
+    def __init__(self, cascade=False, landmark_every=1):
+        self._lock     = threading.Lock()
+        self._mesh     = None
+        self._detector = None
+        self._start    = time.monotonic()
+        self._last_us  = -1
+        self.restarts  = 0
+        self.cascade   = cascade
+        self.landmark_every = max(1, landmark_every)
+        self._landmarks = None  # last single-face landmarks (cascade)
+        self._reused    = 0
+
+    def _next_timestamp(self):
+        # real elapsed time, forced strictly increasing
+        now_us = int((time.monotonic() - self._start) * 1e6)
+        self._last_us = max(now_us, self._last_us + 1)
+        return self._last_us
+
+    def _run_mesh(self, rgb, ts):
+        if self._mesh is None:
+            # behind the cascade the mesh only ever sees single-face frames
+            self._mesh = create_face_mesh(max_num_faces=1 if self.cascade else 2)
+        # the legacy solution API stamps packets with this counter
+        self._mesh._simulated_timestamp = ts
+        return self._mesh.process(rgb).multi_face_landmarks
+
+    def _run_detector(self, rgb, ts):
+        if self._detector is None:
+            self._detector = create_face_detector()
+        self._detector._simulated_timestamp = ts
+        return len(self._detector.process(rgb).detections or [])
+
+    def _run(self, rgb, force):
+        ts = self._next_timestamp()
+        if not self.cascade:
+            landmarks = self._run_mesh(rgb, ts)
+            return FaceResult(len(landmarks or []), landmarks)
+
+        faces = self._run_detector(rgb, ts)
+        if faces != 1:
+            self._landmarks = None
+            cascade_stats.record(mesh=False, reused=False)
+            return FaceResult(faces, None)
+        if self._landmarks is None or force or self._reused + 1 >= self.landmark_every:
+            landmarks = self._run_mesh(rgb, ts)
+            self._landmarks, self._reused = (landmarks[:1] if landmarks else None), 0
+            cascade_stats.record(mesh=True, reused=False)
+        else:
+            self._reused += 1
+            cascade_stats.record(mesh=False, reused=True)
+        return FaceResult(1, self._landmarks)
+
+    def process(self, rgb, force=False):
+        """Analyse one RGB frame, rebuilding the graphs once on error.
+
+        ``force`` runs the mesh on this frame even if the cascade would
+        reuse the previous landmarks.
+        """
+        with self._lock:
+            try:
+                return self._run(rgb, force)
+            except Exception as mp_error:
+                print(f"MediaPipe graph error, recreating: {mp_error}")
+                self._close()
+                self.restarts += 1
+                return self._run(rgb, force)
+
+    def warmup(self, shape=(480, 640, 3)):
+        """Build every graph this session uses and run it on a blank frame."""
+        blank = np.zeros(shape, dtype=np.uint8)
+        with self._lock:
+            self._run_mesh(blank, self._next_timestamp())
+            if self.cascade:
+                self._run_detector(blank, self._next_timestamp())
+
+    def _close(self):
+        for graph in (self._mesh, self._detector):
+            if graph is not None:
+                try:
+                    graph.close()
+                except Exception:
+                    pass
+        self._mesh = self._detector = self._landmarks = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+# ── Face signals ───────────────────────────
+def head_pose(landmarks):
+    l, r = landmarks[33], landmarks[263]
+    return math.degrees(math.atan2(r.y - l.y, r.x - l.x))
+
+def gaze_ratio(landmarks):
+    iris = [landmarks[i] for i in (468,469,470,471)]
+    left_x, right_x = min(p.x for p in iris), max(p.x for p in iris)
+    return ((left_x+right_x)/2 - landmarks[33].x) / (landmarks[133].x - landmarks[33].x + 1e-6)
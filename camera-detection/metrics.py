@@ -0,0 +1,172 @@
+"""Low-overhead pipeline metrics, rendered in the Prometheus text format.
+
+Histograms use fixed buckets and a ``bisect`` per observation, so timing a
+stage costs a few microseconds and can stay on in production.  Gauges are
+callbacks evaluated only when ``/metrics`` is scraped.
+
+``SampledProfiler`` runs a small random fraction of calls (YOLO forward
+passes, FaceMesh) under cProfile and accumulates the stats per stage for
+``/profile``; with a sample rate of 0 it is a plain function call.
+"""
+import bisect, cProfile, io, pstats, random, threading, time
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + '}'
+
+
+class _Timer:
+    __slots__ = ('hist', 'labels', 't0')
+
+    def __init__(self, hist, labels):
+        self.hist, self.labels = hist, labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.t0, *self.labels)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock   = threading.Lock()
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, *labels):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[idx] += 1
+            series[-2]  += value
+            series[-1]  += 1
+
+    def time(self, *labels):
+        """``with hist.time('stage'):`` observes the block's wall time."""
+        return _Timer(self, labels)
+
+    def render(self):
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                yield f'{self.name}_bucket{_labels(self.label_names + ("le",), labels + (le,))} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.label_names, labels)} {values[-2]:.6f}'
+            yield f'{self.name}_count{_labels(self.label_names, labels)} {values[-1]}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._lock   = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f'{self.name}{_labels(self.label_names, labels)} {value}'
+
+
+class Gauge:
+    """Value(s) computed at scrape time: ``fn()`` returns a number, or a
+    dict of label-value tuples to numbers when ``labels`` are given."""
+    kind = 'gauge'
+
+    def __init__(self, name, help, fn, labels=()):
+        self.name, self.help, self.label_names, self.fn = name, help, tuple(labels), fn
+
+    def render(self):
+        value = self.fn()
+        items = value.items() if self.label_names else [((), value)]
+        for labels, v in items:
+            yield f'{self.name}{_labels(self.label_names, labels)} {v}'
+
+
+class Metrics:
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name, help, fn, labels=()):
+        return self._add(Gauge(name, help, fn, labels))
+
+    def render(self):
+        out = []
+        for m in self._metrics:
+            out.append(f'# HELP {m.name} {m.help}')
+            out.append(f'# TYPE {m.name} {m.kind}')
+            try:
+                out.extend(m.render())
+            except Exception as e:
+                out.append(f'# {m.name} unavailable: {e}')
+        return '\n'.join(out) + '\n'
+
+
+class SampledProfiler:
+    def __init__(self, rate=0.0):
+        self.rate    = rate
+        self._lock   = threading.Lock()  # cProfile allows one active profiler
+        self._stats  = {}
+        self.samples = {}
+
+    def call(self, stage, fn, *args, **kwargs):
+        if not self.rate or random.random() >= self.rate or not self._lock.acquire(blocking=False):
+            return fn(*args, **kwargs)
+        try:
+            prof = cProfile.Profile()
+            result = prof.runcall(fn, *args, **kwargs)
+            if stage in self._stats:
+                self._stats[stage].add(prof)
+            else:
+                self._stats[stage] = pstats.Stats(prof)
+            self.samples[stage] = self.samples.get(stage, 0) + 1
+            return result
+        finally:
+            self._lock.release()
+
+    def wrap(self, stage, fn):
+        return lambda *args, **kwargs: self.call(stage, fn, *args, **kwargs)
+
+    def report(self, stage, limit=30, sort='cumulative'):
+        with self._lock:
+            stats = self._stats.get(stage)
+            if stats is None:
+                return None
+            buf = io.StringIO()
+            stats.stream = buf
+            stats.sort_stats(sort).print_stats(limit)
+        return f"{self.samples[stage]} sampled calls\n" + buf.getvalue()
@@ -0,0 +1,83 @@
+"""Motion-gated, keyframe-scheduled object detection.
+
+Consecutive webcam frames of a student sitting still are near-identical, so
+re-running YOLO on each of them buys nothing.  Each student gets a
+``DetectionGate`` that keeps a tiny grayscale thumbnail of the last frame
+YOLO actually ran on.  A new frame only goes to YOLO when it differs from
+that keyframe by more than ``threshold`` (mean absolute difference, 0-255)
+or when ``keyframe_interval`` frames have been reused in a row; otherwise
+the previous detections are returned as-is.
+
+Reused detections must not build up a phone/object streak on their own:
+while any detection rule's counter is non-zero the caller passes
+``force=True`` (``RuleEngine.detection_pending``) and YOLO runs on every
+frame, so each hit that advances a debounce counter comes from a fresh
+run, as it did before the gate.
+"""
+import threading, time
+import cv2
+
+THUMB_SIZE = (32, 24)
+
+
+class GateStats:
+    """Process-wide run/skip counters, used to report skip rate and CPU saved."""
+
+    def __init__(self):
+        self._lock     = threading.Lock()
+        self.runs      = 0
+        self.skips     = 0
+        self.yolo_time = 0.0
+
+    def record_run(self, seconds):
+        with self._lock:
+            self.runs      += 1
+            self.yolo_time += seconds
+
+    def record_skip(self):
+        with self._lock:
+            self.skips += 1
+
+    def snapshot(self):
+        with self._lock:
+            total    = self.runs + self.skips
+            mean_run = self.yolo_time / self.runs if self.runs else 0.0
+            return {
+                'yolo_runs': self.runs,
+                'yolo_skips': self.skips,
+                'skip_rate': round(self.skips / total, 3) if total else 0.0,
+                'mean_yolo_ms': round(mean_run * 1000, 1),
+                'cpu_saved_s': round(self.skips * mean_run, 1),
+            }
+
+
+gate_stats = GateStats()
+
+
+class DetectionGate:
+    def __init__(self, threshold, keyframe_interval):
+        self.threshold         = threshold
+        self.keyframe_interval = keyframe_interval
+        self.key_thumb         = None
+        self.results           = None
+        self.reused            = 0
+
+    def run(self, rgb, detect, force=False):
+        """Return detections for the RGB frame, calling ``detect()`` only when
+        needed (always with ``force``)."""
+        small = cv2.resize(rgb, THUMB_SIZE, interpolation=cv2.INTER_AREA)
+        thumb = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+
+        if (not force and self.threshold > 0 and self.results is not None
+                and self.reused < self.keyframe_interval
+                and cv2.absdiff(thumb, self.key_thumb).mean() < self.threshold):
+            self.reused += 1
+            gate_stats.record_skip()
+            return self.results
+
+        t0 = time.perf_counter()
+        self.results = detect()
+        gate_stats.record_run(time.perf_counter() - t0)
+        self.key_thumb = thumb
+        self.reused    = 0
+        return self.results
@@ -0,0 +1,54 @@
+"""Shared per-frame preprocessing.
+
+A decoded webcam frame used to be converted to RGB at full camera
+resolution, handed to FaceMesh as is, and then resized again by YOLO's own
+letterbox.  Instead ``to_rgb`` downscales it once (to at most ``max_side``
+pixels on the long side, the detector's input size by default) and converts
+the small image; FaceMesh, the motion gate and the detector all read that
+one buffer.  The detector input is letterboxed from it separately and only
+for frames the motion gate actually sends to YOLO (``backend.prepare``).
+
+``desk_roi`` is the optional face-guided crop: for a student sitting in
+front of the camera, phones and notes show up beside and below the face,
+so the detector gets the region from a little above the face down to the
+bottom of the frame, a few face widths either side.  Objects in it are
+larger at the detector's fixed input size, which matters most at 320/416.
+"""
+import cv2
+
+ROI_WIDTH  = 3.0   # face widths on either side of the face
+ROI_ABOVE  = 0.5   # face heights above the face
+ROI_MIN_GAIN = 0.8  # skip crops that keep more than this share of the frame
+
+
+def to_rgb(frame, max_side):
+    """BGR frame → RGB, downscaled so its long side is at most ``max_side``."""
+    h, w  = frame.shape[:2]
+    scale = max_side / max(h, w) if max_side else 1.0
+    if scale < 1.0:
+        frame = cv2.resize(frame, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+def face_box(landmarks, shape):
+    """Pixel bounding box ``(x0, y0, x1, y1)`` of FaceMesh landmarks."""
+    h, w = shape[:2]
+    xs = [p.x for p in landmarks]
+    ys = [p.y for p in landmarks]
+    return min(xs) * w, min(ys) * h, max(xs) * w, max(ys) * h
+
+
+def desk_roi(landmarks, shape):
+    """Hands-and-desk crop around one face, or None when it would not help."""
+    h, w = shape[:2]
+    x0, y0, x1, y1 = face_box(landmarks, shape)
+    fw, fh = x1 - x0, y1 - y0
+    if fw <= 0 or fh <= 0:
+        return None
+    cx = (x0 + x1) / 2
+    rx0 = max(0, int(cx - (0.5 + ROI_WIDTH) * fw))
+    rx1 = min(w, int(cx + (0.5 + ROI_WIDTH) * fw))
+    ry0 = max(0, int(y0 - ROI_ABOVE * fh))
+    if (rx1 - rx0) * (h - ry0) > ROI_MIN_GAIN * w * h:
+        return None
+    return rx0, ry0, rx1, h
@@ -0,0 +1,62 @@
+"""Model load/warmup state behind the ``/ready`` probe.
+
+Each component (detector, face mesh, ffmpeg, ...) moves through
+``pending → loading → loaded → warming → ready`` (or ``failed``), with the
+load and warmup latency recorded along the way.  The server is ready once
+every *required* component is ready; optional ones (ffmpeg for evidence
+clips) are reported but don't hold the replica out of the pool.
+"""
+import threading, time
+
+
+class Readiness:
+    def __init__(self):
+        self._lock       = threading.Lock()
+        self.components  = {}
+        self.started_at  = time.time()
+
+    def add(self, name, required=True):
+        with self._lock:
+            self.components[name] = {'state': 'pending', 'required': required,
+                                     'load_ms': None, 'warmup_ms': None, 'error': None}
+
+    def load(self, name, fn):
+        """Run ``fn`` as the load step of ``name`` (skipped if already loaded)."""
+        if self.components[name]['state'] in ('loaded', 'ready'):
+            return True
+        return self._step(name, fn, 'loading', 'loaded', 'load_ms')
+
+    def warm(self, name, fn=None):
+        """Run the warmup step of ``name`` and mark it ready."""
+        if self.components[name]['state'] == 'failed':
+            return False
+        return self._step(name, fn, 'warming', 'ready', 'warmup_ms')
+
+    def ready(self):
+        with self._lock:
+            return all(c['state'] == 'ready' for c in self.components.values() if c['required'])
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'ready': all(c['state'] == 'ready' for c in self.components.values() if c['required']),
+                'uptime_s': round(time.time() - self.started_at, 1),
+                'models': {name: dict(c) for name, c in self.components.items()},
+            }
+
+    def _set(self, name, **values):
+        with self._lock:
+            self.components[name].update(values)
+
+    def _step(self, name, fn, during, after, timing):
+        self._set(name, state=during)
+        t0 = time.perf_counter()
+        try:
+            if fn:
+                fn()
+        except Exception as e:
+            self._set(name, state='failed', error=str(e))
+            print(f"❌ {name} {during[:-3]} failed: {e}")
+            return False
+        self._set(name, state=after, **{timing: round((time.perf_counter() - t0) * 1000, 1)})
+        return True
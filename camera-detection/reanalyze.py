@@ -0,0 +1,253 @@
+"""Offline re-analysis of recorded exam sessions and stored cheat clips.
+
+Streams frames from video files (recorded sessions, CheatClip MP4s saved to
+disk) or directories of JPEGs through the server's detectors and rule set,
+and writes per input file
+
+    <out>/<name>.verdicts.json   every rule that fired: frame, t, rule, reason, label
+    <out>/<name>.timeline.npz    faces/angle/gaze/classes/phone_conf per frame
+                                 (same layout as ``/timeline?format=npz``)
+
+plus one summary line per file in ``<out>/summary.jsonl``.  Thresholds are
+the server's defaults; override any ``rules.default_rules`` argument with
+``--set`` to see how verdicts move:
+
+    cd camera-detection
+    python reanalyze.py /data/sessions/*.mp4 /data/frames/student42 --out reanalysis \\
+        --jobs 4 --backend onnx --model models/yolov5s-416.onnx --size 416 \\
+        --set head_turn_angle=35 --set gaze_ratio_min=0.25 --set phone_conf=0.5
+
+Frames are sampled at ``--fps`` (1 by default, the exam client's rate);
+JPEG directories are taken to be at ``--jpeg-fps``.  Rules debounce on
+duration (``rules.DEFAULT_DURATIONS``, as the server does by default), so
+a lower sampling rate trades resolution for speed without changing what
+the thresholds mean; ``--debounce frames`` counts frames instead.  Files fan out over a process pool; each worker owns
+one detector (``--threads`` each) and one tracking FaceMesh per file, and
+runs YOLO on ``--batch`` consecutive frames at a time.  Unlike the server,
+YOLO runs on every sampled frame (no motion gate) and every signal is
+recorded, not only the ones the rules needed, so the timelines are complete.
+"""
+import argparse, collections, glob, inspect, json, os, sys, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np, cv2
+
+from batcher import FrameDetections
+from detector_backends import load_detector
+from face_sessions import FaceMeshSession
+from preprocess import to_rgb
+from rules import RuleEngine, FrameSignals, default_rules, DEFAULT_DURATIONS
+from timeline import SignalTimeline
+
+VIDEO_EXTS = ('.mp4', '.webm', '.mkv', '.avi', '.mov')
+
+
+# ── inputs ──────────────────────────────────
+def is_jpeg_dir(path):
+    return bool(glob.glob(os.path.join(path, '*.jp*g')))
+
+
+def expand_inputs(paths):
+    """Video files and JPEG directories; other directories are searched one level down."""
+    out = []
+    for path in paths:
+        if os.path.isfile(path) or is_jpeg_dir(path):
+            out.append(path)
+        elif os.path.isdir(path):
+            out.extend(p for p in sorted(glob.glob(os.path.join(path, '*')))
+                       if p.lower().endswith(VIDEO_EXTS) or (os.path.isdir(p) and is_jpeg_dir(p)))
+        else:
+            sys.exit(f"no such file or directory: {path}")
+    return out
+
+
+def read_frames(path, jpeg_fps):
+    """(source timestamp, BGR frame) pairs in order."""
+    if os.path.isdir(path):
+        for i, p in enumerate(sorted(glob.glob(os.path.join(path, '*.jp*g')))):
+            frame = cv2.imread(p)
+            if frame is not None:
+                yield i / jpeg_fps, frame
+        return
+    cap = cv2.VideoCapture(path)
+    src_fps, i = cap.get(cv2.CAP_PROP_FPS) or 30.0, 0
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        yield i / src_fps, frame
+        i += 1
+    cap.release()
+
+
+def sample_frames(frames, fps):
+    """Keep one frame per 1/fps seconds of source time (all frames if fps is 0)."""
+    next_t = 0.0
+    for t, frame in frames:
+        if not fps or t >= next_t - 1e-6:
+            next_t = t + 1 / fps if fps else 0.0
+            yield t, frame
+
+
+def chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ── worker ──────────────────────────────────
+_worker = {}
+
+
+def init_worker(opts):
+    cv2.setNumThreads(1)
+    if opts['backend'] == 'torch':
+        try:
+            import torch
+            torch.set_num_threads(opts['threads'])
+        except ImportError:
+            pass
+    model = load_detector(opts['backend'], opts['model'], size=opts['size'], conf=0.5, iou=0.45,
+                          threads=opts['threads'], repo=opts['repo'])
+    model.load()
+    _worker.update(opts, detector=model)
+
+
+def analyse(path, name):
+    """Run one file through FaceMesh, YOLO and the rules; returns its summary."""
+    model    = _worker['detector']
+    engine   = RuleEngine(default_rules(**_worker['thresholds']))
+    watched  = list(dict.fromkeys(c for r in engine.rules for c in r.classes))
+    timeline = SignalTimeline(watched)
+    session  = FaceMeshSession(_worker['cascade'], _worker['landmark_every'])
+    interval = 1 / (_worker['fps'] or _worker['jpeg_fps'])
+    counters, verdicts, n = engine.counters(3.0, interval), [], 0
+    t_start  = time.perf_counter()
+
+    frames = sample_frames(read_frames(path, _worker['jpeg_fps']), _worker['fps'])
+    try:
+        for chunk in chunks(((t, to_rgb(f, _worker['max_side'])) for t, f in frames), _worker['batch']):
+            results = model([model.prepare(rgb) for _, rgb in chunk])
+            for i, (t, rgb) in enumerate(chunk):
+                faces   = session.process(rgb, force=engine.face_pending(counters))
+                dets    = FrameDetections(results.xyxy[i], results.names)
+                row     = timeline.append(faces.num_faces, ts=timeline.t0 + t)
+                signals = FrameSignals(faces, lambda dets=dets: dets, timeline, row)
+                hit     = engine.evaluate(counters, signals, ts=t)
+                for rule in engine.rules:  # fill the timeline with every signal
+                    signals.get(rule)
+                if hit:
+                    verdicts.append({'frame': n, 't': round(t, 3), 'rule': hit.rule.name,
+                                     'reason': hit.reason, 'label': hit.label})
+                n += 1
+    finally:
+        session.close()
+    elapsed = time.perf_counter() - t_start
+
+    out = _worker['out']
+    cols, step = timeline.export()
+    np.savez_compressed(os.path.join(out, f'{name}.timeline.npz'), t0=np.float64(0), step=step,
+                        watched=np.array(timeline.watched), **cols)
+    summary = {
+        'file': path, 'name': name, 'frames': n,
+        'seconds': round(float(cols['t'][-1]) if n else 0.0, 1),
+        'elapsed_s': round(elapsed, 2), 'fps': round(n / elapsed, 1) if elapsed else 0.0,
+        'verdicts': len(verdicts),
+        'by_rule': dict(collections.Counter(v['rule'] for v in verdicts)),
+    }
+    with open(os.path.join(out, f'{name}.verdicts.json'), 'w') as f:
+        json.dump(dict(summary, thresholds=_worker['thresholds'], verdict_list=verdicts), f, indent=1)
+    return summary
+
+
+# ── main ────────────────────────────────────
+def parse_thresholds(pairs):
+    """``--set name=value`` → default_rules kwargs (values parsed as JSON when possible)."""
+    params, out = inspect.signature(default_rules).parameters, {}
+    for pair in pairs:
+        key, _, value = pair.partition('=')
+        if key not in params:
+            sys.exit(f"unknown threshold {key!r} (expected one of {', '.join(params)})")
+        try:
+            out[key] = json.loads(value)
+        except ValueError:
+            out[key] = value.split(',') if key == 'object_classes' else value
+    return out
+
+
+def unique_names(paths):
+    names, seen = [], {}
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path.rstrip(os.sep)))[0]
+        seen[stem] = seen.get(stem, 0) + 1
+        names.append(stem if seen[stem] == 1 else f'{stem}-{seen[stem]}')
+    return names
+
+
+def main():
+    cores = os.cpu_count() or 1
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('inputs', nargs='+', help='video files, JPEG directories, or directories of those')
+    ap.add_argument('--out', default='reanalysis')
+    ap.add_argument('--jobs', type=int, default=max(1, cores // 2), help='worker processes')
+    ap.add_argument('--threads', type=int, default=0, help='detector threads per worker (default cores/jobs)')
+    ap.add_argument('--backend', default=os.getenv('DETECTOR_BACKEND', 'torch'))
+    ap.add_argument('--model', default=os.getenv('DETECTOR_MODEL'))
+    ap.add_argument('--repo', default=os.getenv('DETECTOR_REPO'))
+    ap.add_argument('--size', type=int, default=int(os.getenv('DETECTOR_INPUT_SIZE', 640)))
+    ap.add_argument('--batch', type=int, default=8, help='consecutive frames per YOLO batch')
+    ap.add_argument('--fps', type=float, default=1.0, help='sampling rate (0 = every frame)')
+    ap.add_argument('--jpeg-fps', type=float, default=1.0, help='frame rate of JPEG directories')
+    ap.add_argument('--max-side', type=int, default=int(os.getenv('FRAME_MAX_SIDE', 640)))
+    ap.add_argument('--cascade', action='store_true', help='FACE_CASCADE mode')
+    ap.add_argument('--landmark-every', type=int, default=1)
+    ap.add_argument('--debounce', choices=['time', 'frames'], default='time')
+    ap.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                    help='override a rules.default_rules threshold, e.g. head_turn_angle=35')
+    args = ap.parse_args()
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        sys.exit('nothing to analyse')
+    os.makedirs(args.out, exist_ok=True)
+    jobs = max(1, min(args.jobs, len(paths)))
+    thresholds = parse_thresholds(args.set)
+    if args.debounce == 'time':
+        thresholds.setdefault('durations', DEFAULT_DURATIONS)
+    opts = dict(backend=args.backend, model=args.model, repo=args.repo, size=args.size,
+                threads=args.threads or max(1, cores // jobs), batch=args.batch, fps=args.fps,
+                jpeg_fps=args.jpeg_fps, max_side=args.max_side, cascade=args.cascade,
+                landmark_every=args.landmark_every, thresholds=thresholds, out=args.out)
+    print(f"🔁 Re-analysing {len(paths)} file(s) with {jobs} worker(s) x {opts['threads']} thread(s), "
+          f"{args.backend} @ {args.size}px, {args.debounce} debounce, overrides {args.set or 'none'}")
+
+    t0, frames, failed = time.perf_counter(), 0, 0
+    with ProcessPoolExecutor(jobs, initializer=init_worker, initargs=(opts,)) as pool, \
+            open(os.path.join(args.out, 'summary.jsonl'), 'w') as summary_file:
+        futures = {pool.submit(analyse, path, name): path for path, name in zip(paths, unique_names(paths))}
+        for fut in as_completed(futures):
+            try:
+                s = fut.result()
+            except Exception as e:
+                failed += 1
+                print(f"❌ {futures[fut]}: {e}")
+                continue
+            frames += s['frames']
+            summary_file.write(json.dumps(s) + '\n')
+            print(f"✅ {s['name']}: {s['frames']} frames ({s['seconds']:.0f}s) at {s['fps']:.1f} fps, "
+                  f"{s['verdicts']} verdict(s) {s['by_rule'] or ''}")
+
+    elapsed = time.perf_counter() - t0
+    used    = jobs * opts['threads']
+    print(f"📊 {frames} frames in {elapsed:.1f}s: {frames / elapsed:.1f} fps, "
+          f"{frames / elapsed / used:.1f} fps per core ({used} cores); results in {args.out}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
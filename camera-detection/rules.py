@@ -0,0 +1,292 @@
+"""Declarative, cost-ordered cheat detection rules.
+
+A ``Rule`` names the signal it needs, the per-frame test on that signal,
+how many consecutive hits fire it (its debounce counter lives in the
+student's counters dict under ``rule.name``) and what happens when it
+fires (upload evidence and end the exam, or only log it on the server -
+the client gets ``"logged"`` and carries on).  Exam and practice mode run
+the same rules; practice mode just never uploads.
+
+A rule with ``seconds`` debounces by duration instead of frame count when
+frames carry a timestamp: it fires once its hits have lasted that long,
+whatever the client's frame rate.  A streak survives frames that were
+dropped on the way (gaps up to the student's ``FrameClock.max_gap``) but
+not a frame that failed the test, and always needs at least two hits.
+``DEFAULT_DURATIONS`` are the frame thresholds at one frame per second, so
+both modes agree at 1 fps.
+
+Signals are computed lazily by ``FrameSignals`` in cost order, and the
+engine stops at the first rule that fires, so an expensive detector (YOLO)
+never runs on a frame whose verdict is already decided by the face rules.
+Object rules declare a set of class names and a minimum confidence; the
+detections are filtered once per rule with one vectorized ``np.isin`` over
+the class-id column instead of a Python loop over the rows.
+
+    rule signal   value passed to ``test``
+    -----------   ------------------------------------------------
+    faces         number of faces found (FaceMesh or the cascade's detector)
+    angle         head yaw in degrees (None without a face)
+    gaze          horizontal iris ratio (None without a face)
+    detections    name of the first matching detection (or None)
+"""
+import collections, time
+import numpy as np
+from face_sessions import head_pose, gaze_ratio
+
+UPLOAD, LOG = 'upload', 'log'
+SIGNAL_COST = {'faces': 0, 'angle': 1, 'gaze': 1, 'detections': 10}
+FACE_SIGNALS = {'angle', 'gaze'}  # only defined when a face was found
+DEFAULT_DURATIONS = {'NO_FACE_COUNTER': 8.0, 'MULTI_FACE_COUNTER': 5.0, 'HEAD_TURN_COUNTER': 8.0,
+                     'GAZE_COUNTER': 8.0, 'PHONE_COUNTER': 5.0, 'OBJECT_COUNTER': 2.0}
+
+
+class Rule(collections.namedtuple('Rule', 'name signal test frames reason label detail classes min_conf action '
+                                           'seconds')):
+    """One debounced rule; see the module docstring for ``signal`` values.
+
+    ``reason`` is the verdict returned to the client and ``label`` the
+    reason uploaded with the clip (a format string with ``{}`` for the
+    signal value, or a callable); ``detail`` optionally formats the value
+    for the log line.
+    """
+    __slots__ = ()
+
+    def __new__(cls, name, signal, test, frames, reason, label=None, detail=None,
+                classes=(), min_conf=0.0, action=UPLOAD, seconds=None):
+        if signal not in SIGNAL_COST:
+            raise ValueError(f"unknown rule signal {signal!r}")
+        return super().__new__(cls, name, signal, test, frames, reason, label or reason,
+                               detail, tuple(classes), min_conf, action, seconds)
+
+
+class FrameClock:
+    """Per-student frame time: rejects late/duplicate frames and remembers
+    when each rule's current streak started.
+
+    ``interval`` is how long the client was asked to wait before sending
+    the next frame (see ``pace``); a gap between hits of up to
+    ``max_gap`` - ``min_gap`` or 2.5 intervals, whichever is longer - is
+    taken for pacing rather than a dropped frame, so backing clients off
+    under load doesn't break every streak.
+
+    A frame more than ``rewind`` seconds older than the newest one is not
+    a late frame but a client clock stepped back (or a different device):
+    it starts a new stream instead of being rejected, so one bad
+    timestamp can't stall the student's analysis.
+    """
+    rewind = 60.0
+    __slots__ = ('min_gap', 'interval', 'last_ts', 'newest', 'since', 'last_hit')
+
+    def __init__(self, min_gap=3.0, interval=1.0):
+        self.min_gap  = min_gap
+        self.interval = interval
+        self.last_ts  = None
+        self.newest   = None  # (ts, seq) of the newest accepted frame
+        self.since    = {}  # rule name -> streak start
+        self.last_hit = {}  # rule name -> time of the streak's latest hit
+
+    def accept(self, ts, seq=None):
+        """False for a frame older than (or a repeat of) one already processed.
+
+        Frames are ordered by ``ts``; ``seq`` only orders frames with the
+        same timestamp, so a reloaded page that restarts its sequence at 0
+        is simply a newer stream.
+        """
+        if ts is None:
+            return True
+        if self.newest is not None:
+            newest_ts, newest_seq = self.newest
+            if ts < newest_ts - self.rewind:
+                self.reset()
+            elif ts < newest_ts or (ts == newest_ts and (seq is None or newest_seq is None or seq <= newest_seq)):
+                return False
+        self.newest = (ts, seq)
+        return True
+
+    def reset(self):
+        """Forget the stream: frame order and streak starts."""
+        self.last_ts  = None
+        self.newest   = None
+        self.since    = {}
+        self.last_hit = {}
+
+    @property
+    def max_gap(self):
+        return max(self.min_gap, 2.5 * self.interval)
+
+    def pace(self, seconds, analysed=True):
+        """Record the wait the client was just given.  Waits after frames
+        that never reached the rules (refused, stale) add up until a frame
+        is analysed again."""
+        self.interval = seconds if analysed else self.interval + seconds
+
+
+class Hit(collections.namedtuple('Hit', 'rule value')):
+    """A rule that fired on this frame, with the signal value that fired it."""
+    __slots__ = ()
+
+    @property
+    def reason(self):
+        return self.rule.reason.format(self.value)
+
+    @property
+    def label(self):
+        label = self.rule.label
+        return label(self.value) if callable(label) else label.format(self.value)
+
+    @property
+    def detail(self):
+        return self.rule.detail.format(self.value) if self.rule.detail else None
+
+
+def _as_array(dets):
+    return dets.cpu().numpy() if hasattr(dets, 'cpu') else np.asarray(dets)
+
+
+class FrameSignals:
+    """Lazily computed per-frame signals, recorded into the student's timeline.
+
+    ``face_res`` is a ``face_sessions.FaceResult``.
+    """
+
+    def __init__(self, face_res, detect, timeline=None, row=None):
+        self._faces    = face_res.multi_face_landmarks or []
+        self._detect   = detect
+        self._timeline = timeline
+        self._row      = row
+        self._cache    = {}
+        self.faces     = face_res.num_faces
+        self.detect_seconds = 0.0  # time spent in ``detect`` (kept out of rule timing)
+
+    def get(self, rule):
+        if rule.signal == 'faces':
+            return self.faces
+        if rule.signal == 'detections':
+            return self._first_match(rule)
+        if rule.signal not in self._cache:
+            self._cache[rule.signal] = self._landmark_signal(rule.signal)
+        return self._cache[rule.signal]
+
+    def _landmark_signal(self, signal):
+        if not self._faces:
+            return None
+        lm    = self._faces[0].landmark
+        value = head_pose(lm) if signal == 'angle' else gaze_ratio(lm)
+        if self._timeline is not None:
+            self._timeline.set(self._row, **{signal: value})
+        return value
+
+    def _detections(self):
+        if 'detections' not in self._cache:
+            t0 = time.perf_counter()
+            results = self._detect()
+            self.detect_seconds = time.perf_counter() - t0
+            if self._timeline is not None:
+                self._timeline.set_detections(self._row, results)
+            dets  = _as_array(results.xyxy[0])
+            names = results.names
+            ids   = {n: i for i, n in (names.items() if isinstance(names, dict) else enumerate(names))}
+            self._cache['detections'] = (dets[:, 4], dets[:, 5].astype(np.int64), names, ids)
+        return self._cache['detections']
+
+    def _first_match(self, rule):
+        conf, cls, names, ids = self._detections()
+        wanted = [ids[c] for c in rule.classes if c in ids]
+        hits   = np.flatnonzero(np.isin(cls, wanted) & (conf >= rule.min_conf))
+        return names[int(cls[hits[0]])] if len(hits) else None
+
+
+class RuleEngine:
+    def __init__(self, rules):
+        # cheap signals first; declaration order breaks ties
+        self.rules = sorted(rules, key=lambda r: SIGNAL_COST[r.signal])
+
+    def counters(self, min_gap=3.0, interval=1.0):
+        """Fresh debounce counters (and frame clock) for a new student."""
+        return {**{rule.name: 0 for rule in self.rules}, 'CLOCK': FrameClock(min_gap, interval)}
+
+    def face_pending(self, counters):
+        """True while a head-turn/gaze streak is building (the cascade then
+        runs the landmark model on every frame)."""
+        return any(counters[rule.name] for rule in self.rules if rule.signal in FACE_SIGNALS)
+
+    def detection_pending(self, counters):
+        """True while a phone/object streak is building (the motion gate
+        then runs YOLO on every frame instead of reusing detections)."""
+        return any(counters[rule.name] for rule in self.rules if rule.signal == 'detections')
+
+    def evaluate(self, counters, signals, ts=None, tolerance=0.25):
+        """Update the debounce counters; return the first ``Hit`` or None.
+
+        A rule whose signal is unavailable (no face for head-turn/gaze)
+        leaves its counter untouched.  With a frame time ``ts`` (seconds),
+        rules with ``seconds`` fire on duration, allowing ``tolerance`` for
+        capture jitter; the streak is taken to start at the previous frame,
+        so N hits at one frame per second last N seconds.
+        """
+        clock = counters['CLOCK']
+        try:
+            for rule in self.rules:
+                value = signals.get(rule)
+                if value is None and rule.signal in FACE_SIGNALS:
+                    continue
+                hit = value is not None and rule.test(value)
+                if rule.seconds is None or ts is None:
+                    counters[rule.name] = counters[rule.name] + 1 if hit else 0
+                    fired = counters[rule.name] >= rule.frames
+                else:
+                    fired = hit and self._lasted(rule, counters, clock, ts, tolerance)
+                    if not hit:
+                        counters[rule.name] = 0
+                if fired:
+                    counters[rule.name] = 0
+                    return Hit(rule, value)
+            return None
+        finally:
+            if ts is not None:
+                clock.last_ts = ts
+
+    @staticmethod
+    def _lasted(rule, counters, clock, ts, tolerance):
+        """Extend the rule's streak to ``ts``; True once it lasted ``rule.seconds``.
+
+        The first hit is credited with the gap since the previous frame,
+        which at low frame rates can cover a whole duration on its own, so
+        a streak also needs a second hit (as many as ``rule.frames`` if
+        that's fewer) - one noisy frame never fires.
+        """
+        name, last = rule.name, clock.last_hit.get(rule.name)
+        if not counters[name] or last is None or ts - last > clock.max_gap:
+            prev = clock.last_ts if clock.last_ts is not None else ts - clock.interval
+            clock.since[name] = prev if 0 <= ts - prev <= clock.max_gap else ts
+            counters[name] = 0
+        counters[name] += 1
+        clock.last_hit[name] = ts
+        return (counters[name] >= min(2, rule.frames)
+                and ts - clock.since[name] >= rule.seconds - tolerance)
+
+
+def default_rules(no_face_frames=8, multi_face_frames=5, head_turn_frames=8, head_turn_angle=45,
+                  gaze_frames=8, gaze_ratio_min=0.3, gaze_ratio_max=0.7, phone_frames=5,
+                  phone_conf=0.6, object_frames=2, object_classes=('laptop', 'book', 'tablet', 'remote'),
+                  durations=None):
+    """The proctoring rule set, in evaluation order.
+
+    ``durations`` maps rule names to seconds (e.g. ``DEFAULT_DURATIONS``)
+    for rules that should debounce on time; the rest count frames.
+    """
+    seconds = (durations or {}).get
+    return [
+        Rule('NO_FACE_COUNTER', 'faces', lambda n: n == 0, no_face_frames, "No face detected",
+             seconds=seconds('NO_FACE_COUNTER')),
+        Rule('MULTI_FACE_COUNTER', 'faces', lambda n: n > 1, multi_face_frames, "Multiple faces detected",
+             seconds=seconds('MULTI_FACE_COUNTER')),
+        Rule('HEAD_TURN_COUNTER', 'angle', lambda a: abs(a) > head_turn_angle, head_turn_frames,
+             "Head turned away", detail="Angle: {:.1f}°", seconds=seconds('HEAD_TURN_COUNTER')),
+        Rule('GAZE_COUNTER', 'gaze', lambda r: r < gaze_ratio_min or r > gaze_ratio_max, gaze_frames,
+             "Gaze averted", detail="Ratio: {:.3f}", seconds=seconds('GAZE_COUNTER')),
+        Rule('PHONE_COUNTER', 'detections', bool, phone_frames, "Cell phone",
+             classes=['cell phone'], min_conf=phone_conf, seconds=seconds('PHONE_COUNTER')),
+        Rule('OBJECT_COUNTER', 'detections', bool, object_frames, "Object detected: {}",
+             label=str.capitalize, classes=object_classes, seconds=seconds('OBJECT_COUNTER')),
+    ]
@@ -0,0 +1,145 @@
+"""Bounded, thread-safe store for per-student detection state.
+
+Sessions used to live in module-level dicts that were only cleared by
+``/cleanup_student``, so every crashed tab leaked a FaceMesh graph and a
+buffer of up to 150 frames.  ``SessionStore`` evicts sessions that have
+been idle longer than ``idle_ttl`` seconds and, when ``max_sessions`` is
+reached, the least recently used one.  Evicted sessions are closed, which
+releases the FaceMesh graph and the evidence buffer.
+
+The store only needs ``close()``, ``memory_estimate()`` and a ``last_seen``
+attribute from what it holds, so it also bounds the signal timelines.
+"""
+import collections, os, threading, time
+
+# Rough resident size of one refine_landmarks FaceMesh graph
+FACE_MESH_EST_BYTES = 30 * 1024 * 1024
+
+
+class StudentSession:
+    def __init__(self, student_id, counters, face_mesh):
+        self.student_id = student_id
+        self.counters   = counters
+        self.face_mesh  = face_mesh
+        self.last_seen  = time.monotonic()
+        self.frames     = 0
+        self.fps        = 0.0   # smoothed frame rate, see record_frame()
+        self._last_frame = None
+
+    def record_frame(self):
+        """Count one processed frame and update the smoothed frame rate."""
+        now = time.monotonic()
+        if self._last_frame is not None and now > self._last_frame:
+            rate = 1.0 / (now - self._last_frame)
+            self.fps = rate if not self.fps else 0.8 * self.fps + 0.2 * rate
+        self._last_frame = now
+        self.frames += 1
+
+    def memory_estimate(self):
+        return FACE_MESH_EST_BYTES + self.counters['FRAME_BUFFER'].nbytes
+
+    def close(self):
+        self.face_mesh.close()
+        self.counters['FRAME_BUFFER'].clear()
+
+
+class SessionStore:
+    def __init__(self, factory, idle_ttl, max_sessions, on_evict=None, sweep_interval=30,
+                 label='session for student'):
+        self.factory      = factory
+        self.label        = label
+        self.idle_ttl     = idle_ttl
+        self.max_sessions = max(1, max_sessions)
+        self.on_evict     = on_evict
+        self.evicted      = 0
+        self.sweep_interval = sweep_interval
+        self._sessions    = collections.OrderedDict()  # least recently used first
+        self._start()
+        # prefork workers (workers.py) need their own lock and sweeper
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self._lock = threading.Lock()
+        if self.sweep_interval:
+            threading.Thread(target=self._sweep_loop, args=(self.sweep_interval,),
+                             name='session-sweeper', daemon=True).start()
+
+    def get(self, student_id):
+        """Return the student's session, creating it (and evicting LRU) if needed."""
+        evicted = []
+        with self._lock:
+            session = self._sessions.get(student_id)
+            if session is None:
+                session = self.factory(student_id)
+                self._sessions[student_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    evicted.append(self._sessions.popitem(last=False))
+            else:
+                self._sessions.move_to_end(student_id)
+            session.last_seen = time.monotonic()
+        self._release(evicted, 'max sessions')
+        return session
+
+    def peek(self, student_id):
+        """Return the session if present, without creating or touching it."""
+        with self._lock:
+            return self._sessions.get(student_id)
+
+    def pop(self, student_id):
+        """Remove and close one session; returns True if it existed."""
+        with self._lock:
+            session = self._sessions.pop(student_id, None)
+        if session is not None:
+            session.close()
+        return session is not None
+
+    def sweep(self):
+        """Evict every session idle for longer than ``idle_ttl``."""
+        cutoff = time.monotonic() - self.idle_ttl
+        evicted = []
+        with self._lock:
+            for student_id, session in list(self._sessions.items()):
+                if session.last_seen >= cutoff:
+                    break  # ordered by last use, the rest are newer
+                evicted.append((student_id, self._sessions.pop(student_id)))
+        self._release(evicted, 'idle')
+        return len(evicted)
+
+    def _release(self, evicted, why):
+        for key, session in evicted:
+            print(f"♻️ Evicting {self.label} {key} ({why})")
+            session.close()
+            if self.on_evict:
+                self.on_evict(key)
+        if evicted:
+            with self._lock:
+                self.evicted += len(evicted)
+
+    def _sweep_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Session sweep error: {e}")
+
+    def items(self):
+        """Snapshot of ``(key, session)`` pairs."""
+        with self._lock:
+            return list(self._sessions.items())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            evicted  = self.evicted
+        return {
+            'live': len(sessions),
+            'max': self.max_sessions,
+            'idle_ttl_s': self.idle_ttl,
+            'evicted': evicted,
+            'memory_bytes_est': sum(s.memory_estimate() for s in sessions),
+        }
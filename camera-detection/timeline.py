@@ -0,0 +1,101 @@
+"""Compact per-session timeline of detector signals.
+
+One row per processed frame, stored column-wise in fixed-dtype numpy
+arrays that grow by doubling (~16 bytes per frame, so a three-hour exam
+at 1 fps is well under 200 KB).  Columns:
+
+    t           float32  seconds since the timeline started (``t0``)
+    faces       uint8    FaceMesh face count
+    angle       float32  head_pose() angle in degrees, NaN if not computed
+    gaze        float32  gaze ratio, NaN if not computed
+    classes     uint8    bit i set if watched YOLO class i was detected
+    phone_conf  float16  highest 'cell phone' confidence, 0 if none
+"""
+import math, threading, time
+import numpy as np
+
+COLUMNS = {
+    't': np.float32,
+    'faces': np.uint8,
+    'angle': np.float32,
+    'gaze': np.float32,
+    'classes': np.uint8,
+    'phone_conf': np.float16,
+}
+FILL = {'angle': np.nan, 'gaze': np.nan}
+
+
+class SignalTimeline:
+    def __init__(self, watched_classes, capacity=1024):
+        self.watched   = list(watched_classes)[:8]  # one bit each in 'classes'
+        self.t0        = time.time()
+        self.n         = 0
+        self.last_seen = time.monotonic()
+        self._cols     = {name: np.full(capacity, FILL.get(name, 0), dtype) for name, dtype in COLUMNS.items()}
+        self._lock     = threading.Lock()
+
+    def append(self, faces, ts=None):
+        """Start a row for one frame; returns its index for later ``set`` calls."""
+        with self._lock:
+            if self.n == len(self._cols['t']):
+                for name, col in self._cols.items():
+                    grown = np.full(2 * len(col), FILL.get(name, 0), col.dtype)
+                    grown[:len(col)] = col
+                    self._cols[name] = grown
+            idx = self.n
+            self._cols['t'][idx]     = (time.time() if ts is None else ts) - self.t0
+            self._cols['faces'][idx] = faces
+            self.n += 1
+            return idx
+
+    def set(self, idx, **values):
+        with self._lock:
+            for name, value in values.items():
+                self._cols[name][idx] = value
+
+    def set_detections(self, idx, results):
+        """Record the watched class hits and phone confidence of a YOLO result."""
+        mask, phone_conf = 0, 0.0
+        for *_, conf, cls in results.xyxy[0]:
+            name = results.names[int(cls)]
+            if name in self.watched:
+                mask |= 1 << self.watched.index(name)
+            if name == 'cell phone':
+                phone_conf = max(phone_conf, float(conf))
+        self.set(idx, classes=mask, phone_conf=phone_conf)
+
+    def export(self, max_points=None):
+        """Columns as arrays, downsampled to at most ``max_points`` buckets.
+
+        Buckets keep the first timestamp, the max face count, the OR of the
+        class bits, the max phone confidence and the mean angle/gaze.
+        Returns ``(columns, step)``.
+        """
+        with self._lock:
+            n    = self.n
+            cols = {name: col[:n].copy() for name, col in self._cols.items()}
+        if not max_points or n <= max_points:
+            return cols, 1
+
+        step = math.ceil(n / max_points)
+        idx  = np.arange(0, n, step)
+        out  = {
+            't': cols['t'][idx],
+            'faces': np.maximum.reduceat(cols['faces'], idx),
+            'classes': np.bitwise_or.reduceat(cols['classes'], idx),
+            'phone_conf': np.fmax.reduceat(cols['phone_conf'], idx),
+        }
+        for name in ('angle', 'gaze'):
+            col   = cols[name]
+            valid = ~np.isnan(col)
+            total = np.add.reduceat(np.where(valid, col, 0), idx)
+            count = np.add.reduceat(valid.astype(np.int32), idx)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out[name] = np.where(count > 0, total / count, np.nan).astype(np.float32)
+        return out, step
+
+    def memory_estimate(self):
+        return sum(col.nbytes for col in self._cols.values())
+
+    def close(self):
+        pass
@@ -0,0 +1,215 @@
+"""Reliable asynchronous upload of cheat clips to the Node backend.
+
+Every clip is first written to a spool directory (``<id>.mp4`` plus a
+``<id>.json`` with the form fields and auth header), then uploaded by a
+fixed pool of workers sharing one pooled ``requests.Session``.  Failed
+uploads are retried with exponential backoff; anything still spooled - the
+backend was down, or the process restarted - is picked up again by a
+periodic rescan.  Uploads rejected with a non-retryable 4xx are moved to
+``<spool>/failed`` instead of being dropped.
+
+A spooled clip carries the student's JWT, which can expire during a long
+outage.  With a ``reauth`` callback, a 401 is retried once with the header
+it returns (a fresh token for the same student) before the clip is
+treated as rejected.
+
+A worker claims a job by renaming ``<id>.json`` to ``<id>.claim``, so
+several prefork workers can share one spool directory safely.
+"""
+import collections, json, os, queue, threading, time, uuid
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRYABLE_STATUS = {408, 429}
+
+
+class EvidenceUploader:
+    def __init__(self, url, spool_dir, workers=2, max_queue=200, max_attempts=5,
+                 backoff=1.0, timeout=10, rescan_interval=60, on_upload=None, reauth=None):
+        self.url          = url
+        self.spool_dir    = spool_dir
+        self.failed_dir   = os.path.join(spool_dir, 'failed')
+        self.max_attempts = max_attempts
+        self.backoff      = backoff
+        self.timeout      = timeout
+        self.workers      = workers
+        self.max_queue    = max_queue
+        self.rescan_interval = rescan_interval
+        self.on_upload    = on_upload  # called with the seconds of each successful POST
+        self.reauth       = reauth     # old auth header -> fresh one (None if it can't)
+        self.uploaded     = 0
+        self.failed       = 0
+        self.latencies    = collections.deque(maxlen=500)
+        os.makedirs(self.failed_dir, mode=0o700, exist_ok=True)
+        self._start()
+        # prefork workers (workers.py) get their own threads and connections
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self.queue      = queue.Queue(maxsize=self.max_queue)
+        self._lock      = threading.Lock()
+        self._pending   = set()  # queued or in flight in this process
+        self.in_flight  = 0
+
+        self.http = requests.Session()
+        adapter   = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        self.http.mount('http://', adapter)
+        self.http.mount('https://', adapter)
+
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f'uploader-{i}', daemon=True).start()
+        threading.Thread(target=self._rescan_loop, args=(self.rescan_interval,),
+                         name='uploader-rescan', daemon=True).start()
+
+    # ── public API ──────────────────────────
+    def submit(self, clip, fields, auth_header):
+        """Spool one clip and queue it for upload; returns the job id."""
+        job_id = uuid.uuid4().hex
+        self._write(f'{job_id}.mp4', clip)
+        # metadata is written last: a job is complete once its .json exists
+        meta = {'fields': fields, 'auth': auth_header, 'spooled_at': time.time()}
+        self._write(f'{job_id}.json', json.dumps(meta).encode())
+        self._enqueue(job_id)
+        return job_id
+
+    def stats(self):
+        with self._lock:
+            lat = sorted(self.latencies)
+            pct = lambda q: round(lat[min(len(lat) - 1, int(q * len(lat)))] * 1000, 1) if lat else 0.0
+            return {
+                'queue_depth': self.queue.qsize(),
+                'in_flight': self.in_flight,
+                'spooled': len(self._spooled_ids()),
+                'uploaded': self.uploaded,
+                'failed': self.failed,
+                'latency_p50_ms': pct(0.50),
+                'latency_p95_ms': pct(0.95),
+            }
+
+    # ── spool ───────────────────────────────
+    def _path(self, name):
+        return os.path.join(self.spool_dir, name)
+
+    def _write(self, name, data):
+        tmp = self._path(name + '.tmp')
+        fd  = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, self._path(name))
+
+    def _spooled_ids(self):
+        return sorted(name[:-5] for name in os.listdir(self.spool_dir) if name.endswith('.json'))
+
+    def _remove(self, job_id, dest_dir=None):
+        for src, dest in ((f'{job_id}.mp4', f'{job_id}.mp4'), (f'{job_id}.claim', f'{job_id}.json')):
+            try:
+                if dest_dir:
+                    os.replace(self._path(src), os.path.join(dest_dir, dest))
+                else:
+                    os.remove(self._path(src))
+            except FileNotFoundError:
+                pass
+
+    def _release_stale_claims(self, max_age):
+        """Put back jobs claimed by a process that died mid-upload."""
+        cutoff = time.time() - max_age
+        for name in os.listdir(self.spool_dir):
+            path = self._path(name)
+            if name.endswith('.claim') and os.path.getmtime(path) < cutoff:
+                os.replace(path, path[:-6] + '.json')
+
+    def _enqueue(self, job_id):
+        with self._lock:
+            if job_id in self._pending:
+                return
+            try:
+                self.queue.put_nowait(job_id)
+            except queue.Full:
+                print(f"⚠️ Upload queue full, clip {job_id} stays spooled")
+                return
+            self._pending.add(job_id)
+
+    def _rescan_loop(self, interval):
+        while True:
+            try:
+                self._release_stale_claims(max(600, 10 * interval))
+                for job_id in self._spooled_ids():
+                    self._enqueue(job_id)
+            except Exception as e:
+                print(f"Spool rescan error: {e}")
+            time.sleep(interval)
+
+    # ── workers ─────────────────────────────
+    def _worker(self):
+        while True:
+            job_id = self.queue.get()
+            with self._lock:
+                self.in_flight += 1
+            try:
+                self._upload(job_id)
+            except Exception as e:
+                print(f"❌ Upload worker error for {job_id}: {e}")
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                    self._pending.discard(job_id)
+
+    def _upload(self, job_id):
+        # claim the job by renaming its metadata, so that several processes
+        # sharing one spool never upload the same clip twice
+        claim = self._path(f'{job_id}.claim')
+        try:
+            os.replace(self._path(job_id + '.json'), claim)
+            os.utime(claim)  # claim age, not spool age, marks it stale
+            with open(claim) as f:
+                meta = json.load(f)
+            with open(self._path(job_id + '.mp4'), 'rb') as f:
+                clip = f.read()
+        except FileNotFoundError:
+            return  # already claimed or uploaded elsewhere
+
+        reauthed = False
+        for attempt in range(self.max_attempts):
+            t0 = time.perf_counter()
+            try:
+                resp = self.http.post(
+                    self.url,
+                    files={'clip': ('cheat.mp4', clip, 'video/mp4')},
+                    data=meta['fields'],
+                    headers={'Authorization': meta['auth']},
+                    timeout=self.timeout
+                )
+            except requests.RequestException as e:
+                print(f"❌ Cheat upload error (attempt {attempt + 1}): {e}")
+            else:
+                if resp.ok:
+                    elapsed = time.perf_counter() - t0
+                    with self._lock:
+                        self.uploaded += 1
+                        self.latencies.append(elapsed)
+                    if self.on_upload:
+                        self.on_upload(elapsed)
+                    self._remove(job_id)
+                    print(f"✅ [uploader] POST /api/cheats → {resp.status_code}", resp.text)
+                    return
+                if resp.status_code == 401 and self.reauth and not reauthed:
+                    reauthed = True
+                    try:
+                        auth = self.reauth(meta['auth'])
+                    except Exception as e:
+                        print(f"⚠️ Could not refresh upload token for {job_id}: {e}")
+                        auth = None
+                    if auth:
+                        print(f"🔑 Upload token for {job_id} expired, retrying with a fresh one")
+                        meta['auth'] = auth
+                        continue
+                if resp.status_code < 500 and resp.status_code not in RETRYABLE_STATUS:
+                    print(f"❌ Cheat upload rejected → {resp.status_code}", resp.text)
+                    with self._lock:
+                        self.failed += 1
+                    self._remove(job_id, self.failed_dir)
+                    return
+                print(f"⚠️ Cheat upload attempt {attempt + 1} → {resp.status_code}")
+            time.sleep(min(self.backoff * 2 ** attempt, 60))
+        # release the claim; the next rescan retries it
+        os.replace(claim, self._path(job_id + '.json'))
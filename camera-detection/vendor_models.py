@@ -0,0 +1,50 @@
+"""Vendor the YOLOv5 code and weights so the server starts offline.
+
+Downloads a pinned ultralytics/yolov5 release into ``models/yolov5`` plus
+its ``yolov5s.pt``.  Run it once at image build time; at runtime set
+
+    DETECTOR_REPO=models/yolov5
+
+and the torch backend loads through ``torch.hub.load(..., source='local')``
+without touching the network.
+
+    cd camera-detection
+    python vendor_models.py --tag v7.0
+"""
+import argparse, io, os, shutil, urllib.request, zipfile
+
+REPO_ZIP = 'https://github.com/ultralytics/yolov5/archive/refs/tags/{tag}.zip'
+WEIGHTS  = 'https://github.com/ultralytics/yolov5/releases/download/{tag}/yolov5s.pt'
+
+
+def fetch(url):
+    with urllib.request.urlopen(url, timeout=120) as resp:
+        return resp.read()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--tag', default='v7.0')
+    ap.add_argument('--out', default=os.path.join('models', 'yolov5'))
+    args = ap.parse_args()
+
+    if os.path.isfile(os.path.join(args.out, 'hubconf.py')) and os.path.isfile(os.path.join(args.out, 'yolov5s.pt')):
+        print(f"✅ {args.out} already vendored")
+        return
+
+    staging = args.out + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    with zipfile.ZipFile(io.BytesIO(fetch(REPO_ZIP.format(tag=args.tag)))) as archive:
+        archive.extractall(staging)
+    (top,) = os.listdir(staging)  # yolov5-<version>/
+    with open(os.path.join(staging, top, 'yolov5s.pt'), 'wb') as f:
+        f.write(fetch(WEIGHTS.format(tag=args.tag)))
+
+    shutil.rmtree(args.out, ignore_errors=True)
+    os.replace(os.path.join(staging, top), args.out)
+    os.rmdir(staging)
+    print(f"✅ YOLOv5 {args.tag} vendored into {args.out}")
+
+
+if __name__ == '__main__':
+    main()
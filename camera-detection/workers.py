@@ -0,0 +1,215 @@
+"""Prefork multi-worker mode with sticky per-student routing.
+
+The parent process imports camera_server (so the YOLO weights are loaded
+once and shared copy-on-write), then forks ``workers`` children.  Each
+child serves the normal Flask app on ``127.0.0.1:base_port+i`` with its
+own share of torch intra-op threads.  The parent then runs a thin router
+on the public port that sends every request of a student to the same
+worker (crc32 of the JWT ``userId``), so the per-student counters,
+FaceMesh graphs and evidence buffers stay local to one process.
+
+If a worker dies the router shuts everything down and exits non-zero;
+the container/orchestrator is expected to restart the service.
+"""
+import json, os, signal, threading, zlib
+import jwt, requests
+from flask import Flask, Response, request
+from flask_sock import Sock
+from simple_websocket import Client, ConnectionClosed
+
+HOP_HEADERS = {'connection', 'keep-alive', 'transfer-encoding', 'content-length',
+               'content-encoding', 'upgrade', 'host'}
+
+
+def _user_id(raw_token):
+    """Unverified userId for routing only - the worker still verifies the token."""
+    if not raw_token:
+        return None
+    token = raw_token.split()[-1]
+    try:
+        return jwt.decode(token, options={'verify_signature': False}).get('userId')
+    except Exception:
+        return None
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except ConnectionClosed:
+        pass
+
+
+def merge_metrics(texts):
+    """Merge per-worker Prometheus texts, adding a ``worker`` label.
+
+    Samples are regrouped under their family's HELP/TYPE lines, which the
+    exposition format requires to appear once per family.
+    """
+    meta, samples = {}, {}
+    for worker, text in enumerate(texts):
+        family = None
+        for line in text.splitlines():
+            if line.startswith('# HELP ') or line.startswith('# TYPE '):
+                family = line.split()[2]
+                meta.setdefault(family, {}).setdefault(line[:6], line)  # first worker's copy
+                samples.setdefault(family, [])
+            elif line and not line.startswith('#') and family:
+                series, _, value = line.rpartition(' ')
+                if '{' in series:
+                    series = series.replace('{', f'{{worker="{worker}",', 1)
+                else:
+                    series = f'{series}{{worker="{worker}"}}'
+                samples[family].append(f'{series} {value}')
+    return ''.join('\n'.join(list(meta[f].values()) + samples[f]) + '\n' for f in meta)
+
+
+def routing_key():
+    """Student id the current request belongs to (None if it can't be told)."""
+    if request.path == '/timeline' and request.args.get('student'):
+        return request.args['student']
+    raw = request.headers.get('Authorization')
+    if not raw and request.mimetype == 'application/json':
+        raw = (request.get_json(silent=True) or {}).get('token')
+    elif not raw and request.mimetype == 'multipart/form-data':
+        raw = request.form.get('token')
+    return _user_id(raw)
+
+
+def create_router(ports):
+    router = Flask('router')
+    sock   = Sock(router)
+    http   = requests.Session()
+    http.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=64))
+
+    def pick(student_id):
+        if student_id is None:
+            return ports[0]
+        return ports[zlib.crc32(str(student_id).encode()) % len(ports)]
+
+    def ask_workers(path):
+        workers = []
+        for port in ports:
+            try:
+                workers.append(http.get(f'http://127.0.0.1:{port}{path}', timeout=5).json())
+            except Exception as e:
+                workers.append({'status': 'unreachable', 'ready': False, 'error': str(e)})
+        return workers
+
+    @router.route('/status', methods=['GET'])
+    def status():
+        workers = ask_workers('/status')
+        ok = all(w.get('status') == 'running' for w in workers)
+        return Response(json.dumps({'status': 'running' if ok else 'degraded', 'workers': workers}),
+                        status=200 if ok else 503, mimetype='application/json')
+
+    @router.route('/metrics', methods=['GET'])
+    def metrics():
+        texts = []
+        for port in ports:
+            try:
+                texts.append(http.get(f'http://127.0.0.1:{port}/metrics', timeout=5).text)
+            except requests.RequestException:
+                texts.append('')
+        return Response(merge_metrics(texts), mimetype='text/plain; version=0.0.4')
+
+    @router.route('/ready', methods=['GET'])
+    def ready():
+        # the replica joins the pool only once every worker is warm
+        workers = ask_workers('/ready')
+        ok = all(w.get('ready') for w in workers)
+        return Response(json.dumps({'ready': ok, 'workers': workers}),
+                        status=200 if ok else 503, mimetype='application/json')
+
+    @router.route('/', defaults={'path': ''}, methods=['GET', 'POST', 'OPTIONS'])
+    @router.route('/<path:path>', methods=['GET', 'POST', 'OPTIONS'])
+    def proxy(path):
+        body = request.get_data(cache=True)
+        port = pick(routing_key())
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS}
+        try:
+            resp = http.request(request.method, f'http://127.0.0.1:{port}/{path}',
+                                params=request.args, data=body, headers=headers,
+                                stream=True, timeout=60)
+        except requests.RequestException as e:
+            return Response(json.dumps({'error': f'worker unavailable: {e}'}), status=502,
+                            mimetype='application/json')
+        out_headers = [(k, v) for k, v in resp.raw.headers.items() if k.lower() not in HOP_HEADERS]
+        return Response(resp.iter_content(chunk_size=65536), status=resp.status_code, headers=out_headers)
+
+    @sock.route('/stream')
+    def stream(ws):
+        hello = ws.receive(timeout=10)
+        try:
+            raw = json.loads(hello or '{}').get('token')
+        except (ValueError, AttributeError):
+            raw = None
+        upstream = Client.connect(f'ws://127.0.0.1:{pick(_user_id(raw))}/stream')
+
+        def pump_back():
+            try:
+                while True:
+                    msg = upstream.receive()
+                    if msg is None:
+                        break
+                    ws.send(msg)
+            except ConnectionClosed:
+                pass
+            finally:
+                _close_quietly(ws)
+
+        threading.Thread(target=pump_back, daemon=True).start()
+        try:
+            upstream.send(hello or '{}')
+            while True:
+                msg = ws.receive()
+                if msg is None:
+                    break
+                upstream.send(msg)
+        except ConnectionClosed:
+            pass
+        finally:
+            _close_quietly(upstream)
+
+    return router
+
+
+def serve_prefork(app, host, port, workers, base_port, threads_per_worker, on_worker_start=None):
+    """Fork ``workers`` copies of ``app`` and route to them from this process."""
+    ports, children = [base_port + i for i in range(workers)], []
+    for worker_port in ports:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                import torch
+                torch.set_num_threads(threads_per_worker)
+            except ImportError:
+                pass  # ONNX Runtime / OpenVINO backends size their own pools
+            if on_worker_start:
+                on_worker_start()  # must not block: the worker should bind right away
+            print(f"👷 Worker {os.getpid()} on 127.0.0.1:{worker_port}, threads={threads_per_worker}")
+            try:
+                app.run(host='127.0.0.1', port=worker_port, threaded=True)
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def shutdown(*_):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        os._exit(1)
+
+    def watch():
+        pid, status = os.wait()
+        print(f"❌ Worker {pid} exited (status {status}); shutting down")
+        shutdown()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    threading.Thread(target=watch, daemon=True).start()
+    print(f"🔀 Router on {host}:{port} → {workers} workers {ports}")
+    try:
+        create_router(ports).run(host=host, port=port, threaded=True)
+    finally:
+        shutdown()
@@ -52,6 +52,10 @@ export default function GiveExam() {
   const streamRef = useRef(null);
   const submittingRef = useRef(false);
   const frameProcessingRef = useRef(false);
+  // Send interval suggested by the AI server (next_interval_ms), in ms
+  const frameIntervalRef = useRef(1000);
+  // Frame sequence number; with the capture time it lets the server debounce on duration
+  const frameSeqRef = useRef(0);
   // Refs for WiFi change state to fix closure issues
   const isWifiChangeModeRef = useRef(false);
   const wifiChangeTimeLeftRef = useRef(0);
@@ -215,8 +219,11 @@ export default function GiveExam() {
       canvas.width = video.videoWidth || 640;
       canvas.height = video.videoHeight || 480;
       ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
+      const capturedAt = Date.now();
       
-      const frameData = canvas.toDataURL('image/jpeg', 0.8);
+      // Send the JPEG as a raw binary body (no base64 data URL)
+      const frameBlob = await new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', 0.8));
+      if (!frameBlob) return;
       const token = sessionStorage.getItem('token');
       
       // Use different endpoints for practice vs real exams
@@ -226,20 +233,24 @@ export default function GiveExam() {
       const response = await fetch(`${YOLO_BACKEND_URL}${endpoint}`, {
         method: 'POST',
         headers: {
-          'Content-Type': 'application/json',
+          'Content-Type': 'image/jpeg',
+          'Authorization': `Bearer ${token}`,
+          'X-Exam-Id': examId,
+          'X-Frame-Ts': String(capturedAt),
+          'X-Frame-Seq': String(frameSeqRef.current++)
         },
-        body: JSON.stringify({
-          frame: frameData,
-          exam: examId,
-          token: `Bearer ${token}`
-        })
+        body: frameBlob
       });
       
+      const result = await response.json().catch(() => ({}));
+      // The server slows clients down under load (and says "busy" when full)
+      if (Number.isFinite(result.next_interval_ms)) {
+        frameIntervalRef.current = Math.min(Math.max(result.next_interval_ms, 250), 10000);
+      }
       if (!response.ok) {
-        console.error('Frame processing failed:', response.status);
+        if (result.status !== 'busy') console.error('Frame processing failed:', response.status);
       } else {
         // Check if cheat was detected in the response
-        const result = await response.json();
         if (result.status === 'cheat_detected') {
           if (isPractice) {
             console.log('🎓 PRACTICE CHEAT DETECTED:', result.reason);
@@ -265,10 +276,12 @@ export default function GiveExam() {
   const startFrameProcessing = useCallback(() => {
     frameProcessingRef.current = true;
     
-    const processLoop = () => {
+    // One frame in flight at a time, paced by the server's suggested interval
+    const processLoop = async () => {
       if (frameProcessingRef.current && !submitted && !alreadySubmitted) {
-        processFrame();
-        setTimeout(processLoop, 1000); // Process frame every second
+        const started = Date.now();
+        await processFrame();
+        setTimeout(processLoop, Math.max(0, frameIntervalRef.current - (Date.now() - started)));
       }
     };
     